@@ -5,9 +5,11 @@ from fastapi.staticfiles import StaticFiles
 import uvicorn
 import os
 import json
+import orjson
 import shutil
 from datetime import datetime, timedelta
 from typing import Optional, List
+from operator import itemgetter
 import logging
 import hashlib
 import hmac
@@ -32,6 +34,7 @@ load_dotenv()
 
 # Import database module for user authentication and file management
 import database as db
+from data_ids import next_id
 
 # Генерация случайного 18-значного кода для ордеров
 def generate_order_code():
@@ -676,7 +679,7 @@ async def send_admin_reply_from_telegram(profile_id: int, text: str, telegram_us
 
         if not chat:
             chat = {
-                "id": len(data["chats"]) + 1,
+                "id": next_id(data, "chats"),
                 "profile_id": profile_id,
                 "profile_name": profile["name"],
                 "telegram_user_id": telegram_user_id,
@@ -686,7 +689,7 @@ async def send_admin_reply_from_telegram(profile_id: int, text: str, telegram_us
 
         # Создаем сообщение от администратора
         message_data = {
-            "id": len(data["messages"]) + 1,
+            "id": next_id(data, "messages"),
             "chat_id": chat["id"],
             "text": text,
             "is_from_user": False,
@@ -907,8 +910,9 @@ def load_data():
         }
 
     try:
-        with open(DATA_FILE, 'r', encoding='utf-8') as f:
-            data = json.load(f)
+        # Bytes straight into orjson, as main.py does: no str decode pass
+        with open(DATA_FILE, 'rb') as f:
+            data = orjson.loads(f.read())
 
         # Ensure all required sections exist
         if "settings" not in data:
@@ -1067,6 +1071,14 @@ def save_data(data):
         return False
 
 
+def index_profiles_by_id(data):
+    """Словарь id -> анкета (первая при дублях id) для поиска анкет в циклах"""
+    profiles_by_id = {}
+    for p in data["profiles"]:
+        profiles_by_id.setdefault(p["id"], p)
+    return profiles_by_id
+
+
 def sanitize_filename(filename: str) -> str:
     """Sanitize filename to prevent path traversal attacks"""
     # Remove any directory path components
@@ -1182,15 +1194,17 @@ def save_uploaded_file(file: UploadFile, telegram_user_id: int = None) -> tuple[
         raise HTTPException(status_code=500, detail="Failed to save file")
 
 
+_IMAGE_EXTENSIONS = frozenset({'jpg', 'jpeg', 'png', 'gif', 'bmp', 'webp'})
+_VIDEO_EXTENSIONS = frozenset({'mp4', 'avi', 'mov', 'mkv', 'webm'})
+
+
 def get_file_type(filename: str) -> str:
     """Определяет тип файла по расширению"""
-    extension = filename.lower().split('.')[-1]
-    image_extensions = ['jpg', 'jpeg', 'png', 'gif', 'bmp', 'webp']
-    video_extensions = ['mp4', 'avi', 'mov', 'mkv', 'webm']
+    extension = filename.rpartition('.')[2].lower()
 
-    if extension in image_extensions:
+    if extension in _IMAGE_EXTENSIONS:
         return 'image'
-    elif extension in video_extensions:
+    elif extension in _VIDEO_EXTENSIONS:
         return 'video'
     else:
         return 'file'
@@ -1603,7 +1617,7 @@ async def crypto_payment(request: Request):
         else:
             # Создаем новый order
             order = {
-                "id": len(data["orders"]) + 1,
+                "id": next_id(data, "orders"),
                 "profile_id": profile_id,
                 "telegram_user_id": telegram_user_id,
                 "amount": amount,
@@ -3620,7 +3634,7 @@ async def send_admin_reply(
     if not chat:
         # Создаем чат только если указан telegram_user_id
         chat = {
-            "id": len(data["chats"]) + 1,
+            "id": next_id(data, "chats"),
             "profile_id": profile_id,
             "profile_name": profile["name"],
             "telegram_user_id": telegram_user_id,
@@ -3649,7 +3663,7 @@ async def send_admin_reply(
                         file_type = get_file_type(file.filename)
 
                         message_data = {
-                            "id": len(data["messages"]) + 1,
+                            "id": next_id(data, "messages"),
                             "chat_id": chat["id"],
                             "file_url": file_url,
                             "file_type": file_type,
@@ -3665,7 +3679,7 @@ async def send_admin_reply(
         # Если только текст (без файлов)
         if not has_files and has_text:
             message_data = {
-                "id": len(data["messages"]) + 1,
+                "id": next_id(data, "messages"),
                 "chat_id": chat["id"],
                 "text": text,
                 "is_from_user": False,
@@ -3780,7 +3794,7 @@ async def send_user_message(profile_id: int, request: Request, telegram_user_id:
                  if c["profile_id"] == profile_id and c.get("telegram_user_id") == telegram_user_id), None)
     if not chat:
         chat = {
-            "id": len(data["chats"]) + 1,
+            "id": next_id(data, "chats"),
             "profile_id": profile_id,
             "profile_name": profile["name"],
             "telegram_user_id": telegram_user_id,
@@ -3798,7 +3812,7 @@ async def send_user_message(profile_id: int, request: Request, telegram_user_id:
     if not profile_orders:
         # Создаем unpaid order
         order = {
-            "id": len(data["orders"]) + 1,
+            "id": next_id(data, "orders"),
             "profile_id": profile_id,
             "telegram_user_id": telegram_user_id,
             "amount": 0,
@@ -3829,7 +3843,7 @@ async def send_user_message(profile_id: int, request: Request, telegram_user_id:
                 file_type = get_file_type(file.filename)
 
                 message_data = {
-                    "id": len(data["messages"]) + 1,
+                    "id": next_id(data, "messages"),
                     "chat_id": chat["id"],
                     "file_url": file_url,
                     "file_type": file_type,
@@ -3843,7 +3857,7 @@ async def send_user_message(profile_id: int, request: Request, telegram_user_id:
         elif text:
             # Если только текст
             message_data = {
-                "id": len(data["messages"]) + 1,
+                "id": next_id(data, "messages"),
                 "chat_id": chat["id"],
                 "text": text,
                 "is_from_user": True,
@@ -3895,10 +3909,11 @@ async def get_user_chats(telegram_user_id: Optional[str] = None):
     chats_list = []
     # Фильтруем чаты по telegram_user_id
     user_chats = [c for c in data["chats"] if c.get("telegram_user_id") == telegram_user_id]
+    profiles_by_id = index_profiles_by_id(data)
 
     for chat in user_chats:
         # Find profile
-        profile = next((p for p in data["profiles"] if p["id"] == chat["profile_id"]), None)
+        profile = profiles_by_id.get(chat["profile_id"])
         if not profile:
             continue
 
@@ -3950,9 +3965,10 @@ async def get_user_orders(status: str = "all", telegram_user_id: Optional[str] =
         orders = user_orders
 
     # Enrich orders with profile data
+    profiles_by_id = index_profiles_by_id(data)
     enriched_orders = []
     for order in orders:
-        profile = next((p for p in data["profiles"] if p["id"] == order.get("profile_id")), None)
+        profile = profiles_by_id.get(order.get("profile_id"))
         if profile:
             enriched_orders.append({
                 "id": order["id"],
@@ -3968,7 +3984,7 @@ async def get_user_orders(status: str = "all", telegram_user_id: Optional[str] =
             })
 
     # Sort by creation time (most recent first)
-    enriched_orders.sort(key=lambda x: x.get("created_at", ""), reverse=True)
+    enriched_orders.sort(key=itemgetter("created_at"), reverse=True)
 
     return {"orders": enriched_orders}
 
@@ -3992,7 +4008,7 @@ async def send_system_message(profile_id: int, message_data: dict, current_user:
 
     if not chat:
         chat = {
-            "id": len(data["chats"]) + 1,
+            "id": next_id(data, "chats"),
             "profile_id": profile_id,
             "profile_name": profile["name"],
             "created_at": datetime.now().isoformat()
@@ -4001,7 +4017,7 @@ async def send_system_message(profile_id: int, message_data: dict, current_user:
 
     # Создаем системное сообщение
     system_message = {
-        "id": len(data["messages"]) + 1,
+        "id": next_id(data, "messages"),
         "chat_id": chat["id"],
         "text": message_data["text"],
         "is_system": True,
@@ -4010,6 +4026,10 @@ async def send_system_message(profile_id: int, message_data: dict, current_user:
 
     data["messages"].append(system_message)
 
+    # Флаг избавляет main.py от поиска этого сообщения при каждом комментарии
+    if "transaction successful" in message_data["text"].lower():
+        chat["has_completed_transaction"] = True
+
     # Если это сообщение об успешной транзакции, меняем статус платежа на "booked"
     if "transaction successful" in message_data["text"].lower() or "booking has been confirmed" in message_data["text"].lower():
         # Находим pending платеж для этого профиля
@@ -4054,7 +4074,7 @@ async def add_admin_comment(comment_data: dict, current_user: str = Depends(get_
 
     # Создаем новый комментарий с правильной структурой
     new_comment = {
-        "id": len(data["comments"]) + 1,
+        "id": next_id(data, "comments"),
         "profile_id": comment_data.get("profile_id"),
         "user_name": comment_data.get("author_name"),  # Используем user_name для совместимости
         "telegram_username": "",  # Пустое для админских комментариев
@@ -4088,7 +4108,7 @@ async def create_admin_promocode(promocode: dict, current_user: str = Depends(ge
         raise HTTPException(status_code=400, detail="Promocode already exists")
 
     new_promocode = {
-        "id": len(data["promocodes"]) + 1,
+        "id": next_id(data, "promocodes"),
         "code": promocode["code"].upper(),
         "discount": promocode["discount"],
         "is_active": True,
@@ -4127,9 +4147,10 @@ async def get_admin_bookings(current_user: str = Depends(get_current_user)):
     orders = data.get("orders", [])
 
     # Добавляем информацию о профиле к каждому заказу
+    profiles_by_id = index_profiles_by_id(data)
     enriched_orders = []
     for order in orders:
-        profile = next((p for p in data["profiles"] if p["id"] == order.get("profile_id")), None)
+        profile = profiles_by_id.get(order.get("profile_id"))
         order_copy = order.copy()
         # Убедимся что order_number есть
         if "order_number" not in order_copy or not order_copy.get("order_number"):
@@ -4179,7 +4200,7 @@ async def confirm_booking_payment(order_id: int, current_user: str = Depends(get
                         if c["profile_id"] == profile_id and c.get("telegram_user_id") == telegram_user_id), None)
             if not chat:
                 chat = {
-                    "id": len(data["chats"]) + 1,
+                    "id": next_id(data, "chats"),
                     "profile_id": profile_id,
                     "telegram_user_id": telegram_user_id,
                     "profile_name": profile["name"],
@@ -4189,13 +4210,14 @@ async def confirm_booking_payment(order_id: int, current_user: str = Depends(get
 
             # Создаем системное сообщение
             system_message = {
-                "id": len(data["messages"]) + 1,
+                "id": next_id(data, "messages"),
                 "chat_id": chat["id"],
                 "text": "Transaction successful, your booking has been confirmed",
                 "is_system": True,
                 "created_at": datetime.now().isoformat()
             }
             data["messages"].append(system_message)
+            chat["has_completed_transaction"] = True
 
     save_data(data)
     return {"status": "confirmed", "order_id": order_id}
@@ -4450,7 +4472,7 @@ async def api_confirm_payment(payment_id: str, current_user: str = Depends(get_c
             chat = next((c for c in data["chats"] if c["profile_id"] == profile_id), None)
             if not chat:
                 chat = {
-                    "id": len(data["chats"]) + 1,
+                    "id": next_id(data, "chats"),
                     "profile_id": profile_id,
                     "profile_name": profile["name"],
                     "created_at": datetime.now().isoformat()
@@ -4459,13 +4481,14 @@ async def api_confirm_payment(payment_id: str, current_user: str = Depends(get_c
 
             # Создаем системное сообщение
             system_message = {
-                "id": len(data["messages"]) + 1,
+                "id": next_id(data, "messages"),
                 "chat_id": chat["id"],
                 "text": "Transaction successful, your booking has been confirmed",
                 "is_system": True,
                 "created_at": datetime.now().isoformat()
             }
             data["messages"].append(system_message)
+            chat["has_completed_transaction"] = True
 
     save_data(data)
     logger.info(f"Admin {current_user} confirmed payment {payment_id}")
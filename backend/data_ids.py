@@ -0,0 +1,34 @@
+"""
+Id allocation for records stored in data.json
+
+main.py and admin.py both append chats, messages, orders, comments and
+promocodes to the same data.json, so both must take new ids from here.
+"""
+
+from typing import Optional
+
+
+def next_id(data: dict, collection: str, known_max: Optional[int] = None) -> int:
+    """
+    Allocate the next id for data[collection]
+
+    data["_seq"] holds a per-collection counter that is saved with data.json
+    and only grows, so ids of deleted records are never handed out again.
+    The counter is combined with the largest id present in the collection,
+    which covers records written before the counter existed.
+
+    Args:
+        data: The loaded data.json dict (mutated: the counter is advanced)
+        collection: Key of the list in data, e.g. "messages"
+        known_max: Largest id in the collection if the caller already knows
+            it (main.py keeps it in its data indexes); scanned otherwise
+
+    Returns:
+        The new id
+    """
+    if known_max is None:
+        known_max = max((item.get("id") or 0 for item in data.get(collection, [])), default=0)
+    seq = data.setdefault("_seq", {})
+    new_id = max(seq.get(collection, 0), known_max) + 1
+    seq[collection] = new_id
+    return new_id
@@ -6,8 +6,12 @@ Handles user authentication, file storage, and user data isolation
 import sqlite3
 import os
 import logging
+import orjson
+import threading
+import time
 from datetime import datetime
-from typing import Optional, List, Dict, Any
+from pathlib import Path
+from typing import Optional, List, Dict, Any, Iterator, Tuple
 from contextlib import contextmanager
 
 logger = logging.getLogger(__name__)
@@ -17,11 +21,17 @@ current_dir = os.path.dirname(os.path.abspath(__file__))
 DATABASE_PATH = os.path.join(current_dir, "app_database.db")
 
 
+def _now_iso() -> str:
+    """Current local time as ISO-8601 string"""
+    return datetime.now().isoformat()
+
+
 @contextmanager
 def get_db_connection():
     """Context manager for database connections"""
     conn = sqlite3.connect(DATABASE_PATH)
     conn.row_factory = sqlite3.Row  # Enable column access by name
+    conn.execute("PRAGMA journal_size_limit = 6144000")  # Cap leftover journal/WAL file size
     try:
         yield conn
         conn.commit()
@@ -33,6 +43,32 @@ def get_db_connection():
         conn.close()
 
 
+# Read-only connection per thread for hot lookups. Python's sqlite3 keeps
+# compiled statements in a per-connection cache, so reusing a connection means
+# the same SQL is parsed once instead of on every call; one connection per
+# thread keeps concurrent readers from queueing behind a shared lock.
+_read_local = threading.local()
+
+
+@contextmanager
+def get_read_connection():
+    """Context manager for this thread's read-only database connection"""
+    conn = getattr(_read_local, "conn", None)
+    if conn is None:
+        conn = sqlite3.connect(
+            f"{Path(DATABASE_PATH).as_uri()}?mode=ro",
+            uri=True,
+            cached_statements=512
+        )
+        conn.row_factory = sqlite3.Row
+        _read_local.conn = conn
+    try:
+        yield conn
+    except Exception as e:
+        logger.error(f"Database error: {e}")
+        raise
+
+
 def init_database():
     """Initialize database with schema"""
     with get_db_connection() as conn:
@@ -231,7 +267,7 @@ def init_database():
             CREATE TABLE IF NOT EXISTS sessions (
                 session_id TEXT PRIMARY KEY,
                 telegram_id INTEGER NOT NULL,
-                user_data TEXT NOT NULL,  -- JSON
+                user_data BLOB NOT NULL,  -- JSON (orjson bytes; older rows may be TEXT)
                 created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
                 last_activity DATETIME DEFAULT CURRENT_TIMESTAMP,
                 expires_at DATETIME NOT NULL
@@ -248,6 +284,10 @@ def init_database():
             ON sessions(expires_at)
         """)
 
+        # session_id lookups use the PRIMARY KEY index; drop the covering index
+        # earlier versions created, it duplicated every user_data blob
+        cursor.execute("DROP INDEX IF EXISTS idx_sessions_cover")
+
         # Create indexes for performance
         cursor.execute("CREATE INDEX IF NOT EXISTS idx_dating_profiles_visible ON dating_profiles(visible)")
         cursor.execute("CREATE INDEX IF NOT EXISTS idx_dating_profiles_city ON dating_profiles(city)")
@@ -258,6 +298,7 @@ def init_database():
         cursor.execute("CREATE INDEX IF NOT EXISTS idx_messages_telegram_user_id ON messages(telegram_user_id)")
         cursor.execute("CREATE INDEX IF NOT EXISTS idx_orders_telegram_user_id ON orders(telegram_user_id)")
         cursor.execute("CREATE INDEX IF NOT EXISTS idx_orders_status ON orders(status)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_orders_user_created ON orders(telegram_user_id, created_at DESC)")
         cursor.execute("CREATE INDEX IF NOT EXISTS idx_comments_profile_id ON comments(profile_id)")
         cursor.execute("CREATE INDEX IF NOT EXISTS idx_promocodes_code ON promocodes(code)")
 
@@ -431,10 +472,11 @@ def get_user_files(telegram_user_id: int) -> List[Dict[str, Any]]:
         return [dict(file) for file in files]
 
 
-def get_file_by_id(file_id: int, telegram_user_id: int) -> Optional[Dict[str, Any]]:
+def get_file_by_id(file_id: int, telegram_user_id: int) -> Optional[sqlite3.Row]:
     """
     Get file by ID with ownership verification
     Returns None if file doesn't exist or doesn't belong to user
+    Returns sqlite3.Row (key access, no dict copy) since callers only read fields
 
     Security: Critical function for preventing unauthorized file access
     """
@@ -464,11 +506,11 @@ def get_file_by_id(file_id: int, telegram_user_id: int) -> Optional[Dict[str, An
         else:
             logger.warning(f"Unauthorized file access attempt: file_id={file_id}, telegram_user_id={telegram_user_id}")
 
-        return dict(file) if file else None
+        return file
 
 
-def get_file_by_filename(filename: str, telegram_user_id: int) -> Optional[Dict[str, Any]]:
-    """Get file by filename with ownership verification"""
+def get_file_by_filename(filename: str, telegram_user_id: int) -> Optional[sqlite3.Row]:
+    """Get file by filename with ownership verification (as sqlite3.Row)"""
     with get_db_connection() as conn:
         cursor = conn.cursor()
         cursor.execute("""
@@ -478,8 +520,7 @@ def get_file_by_filename(filename: str, telegram_user_id: int) -> Optional[Dict[
             WHERE filename = ? AND telegram_user_id = ?
         """, (filename, telegram_user_id))
 
-        file = cursor.fetchone()
-        return dict(file) if file else None
+        return cursor.fetchone()
 
 
 def delete_file(file_id: int, telegram_user_id: int) -> bool:
@@ -711,6 +752,66 @@ def get_profile_by_user_id(user_id: int) -> Optional[Dict[str, Any]]:
         return dict(profile) if profile else None
 
 
+# ==================== ROW TYPES ====================
+
+class _Record:
+    """Base for fixed-schema rows built directly by a cursor row factory"""
+    __slots__ = ()
+
+    def _asdict(self) -> Dict[str, Any]:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def __repr__(self):
+        fields = ', '.join(f"{name}={getattr(self, name)!r}" for name in self.__slots__)
+        return f"{type(self).__name__}({fields})"
+
+
+class Order(_Record):
+    """Order row (every orders column plus profile_name) as returned by iter_user_orders"""
+    __slots__ = ('id', 'telegram_user_id', 'profile_id', 'service_type', 'amount',
+                 'currency', 'payment_method', 'payment_wallet', 'status',
+                 'created_at', 'confirmed_at', 'details', 'profile_name')
+
+    def __init__(self, id, telegram_user_id, profile_id, service_type, amount,
+                 currency, payment_method, payment_wallet, status,
+                 created_at, confirmed_at, details, profile_name):
+        self.id = id
+        self.telegram_user_id = telegram_user_id
+        self.profile_id = profile_id
+        self.service_type = service_type
+        self.amount = amount
+        self.currency = currency
+        self.payment_method = payment_method
+        self.payment_wallet = payment_wallet
+        self.status = status
+        self.created_at = created_at
+        self.confirmed_at = confirmed_at
+        self.details = details
+        self.profile_name = profile_name
+
+
+class Comment(_Record):
+    """Comment row as returned by iter_profile_comments"""
+    __slots__ = ('id', 'profile_id', 'telegram_user_id', 'author_name', 'rating',
+                 'comment', 'created_at', 'visible')
+
+    def __init__(self, id, profile_id, telegram_user_id, author_name, rating,
+                 comment, created_at, visible):
+        self.id = id
+        self.profile_id = profile_id
+        self.telegram_user_id = telegram_user_id
+        self.author_name = author_name
+        self.rating = rating
+        self.comment = comment
+        self.created_at = created_at
+        self.visible = visible
+
+
+def _record_factory(record_cls):
+    """Row factory that builds record_cls positionally from the row tuple"""
+    return lambda cursor, row: record_cls(*row)
+
+
 # ==================== DATING APP FUNCTIONS ====================
 
 def get_all_dating_profiles(filters: Dict = None) -> List[Dict]:
@@ -783,8 +884,7 @@ def get_chat_by_profile_and_user(profile_id: int, telegram_user_id: int) -> Opti
 
         if not chat:
             # Create new chat
-            from datetime import datetime
-            now = datetime.now().isoformat()
+            now = _now_iso()
             cursor.execute("""
                 INSERT INTO chats (profile_id, telegram_user_id, created_at, last_message_at)
                 VALUES (?, ?, ?, ?)
@@ -798,18 +898,18 @@ def get_chat_by_profile_and_user(profile_id: int, telegram_user_id: int) -> Opti
 def add_message(chat_id: int, profile_id: int, telegram_user_id: Optional[int],
                 sender_type: str, content: str) -> int:
     """Add message to chat"""
-    from datetime import datetime
+    now = _now_iso()
     with get_db_connection() as conn:
         cursor = conn.cursor()
         cursor.execute("""
             INSERT INTO messages (chat_id, profile_id, telegram_user_id, sender_type, content, timestamp)
             VALUES (?, ?, ?, ?, ?, ?)
-        """, (chat_id, profile_id, telegram_user_id, sender_type, content, datetime.now().isoformat()))
+        """, (chat_id, profile_id, telegram_user_id, sender_type, content, now))
 
         # Update last_message_at in chats
         cursor.execute("""
             UPDATE chats SET last_message_at = ? WHERE id = ?
-        """, (datetime.now().isoformat(), chat_id))
+        """, (now, chat_id))
 
         return cursor.lastrowid
 
@@ -828,8 +928,8 @@ def get_messages_by_chat(chat_id: int, limit: int = 100) -> List[Dict]:
         return [dict(m) for m in messages]
 
 
-def get_user_chats(telegram_user_id: int) -> List[Dict]:
-    """Get all chats for a user"""
+def iter_user_chats(telegram_user_id: int) -> Iterator[Dict]:
+    """Yield all chats for a user one row at a time"""
     with get_db_connection() as conn:
         cursor = conn.cursor()
         cursor.execute("""
@@ -839,13 +939,17 @@ def get_user_chats(telegram_user_id: int) -> List[Dict]:
             WHERE c.telegram_user_id = ?
             ORDER BY c.last_message_at DESC
         """, (telegram_user_id,))
-        chats = cursor.fetchall()
-        return [dict(c) for c in chats]
+        for row in cursor:
+            yield dict(row)
+
+
+def get_user_chats(telegram_user_id: int) -> List[Dict]:
+    """Get all chats for a user"""
+    return list(iter_user_chats(telegram_user_id))
 
 
 def add_order(order_data: Dict) -> int:
     """Add new order"""
-    from datetime import datetime
     with get_db_connection() as conn:
         cursor = conn.cursor()
         cursor.execute("""
@@ -856,30 +960,37 @@ def add_order(order_data: Dict) -> int:
             order_data.get('telegram_user_id'), order_data['profile_id'],
             order_data['service_type'], order_data['amount'], order_data.get('currency', 'USD'),
             order_data.get('payment_method'), order_data.get('payment_wallet'),
-            order_data.get('status', 'pending'), datetime.now().isoformat(),
+            order_data.get('status', 'pending'), _now_iso(),
             order_data.get('details')
         ))
         return cursor.lastrowid
 
 
-def get_user_orders(telegram_user_id: int) -> List[Dict]:
-    """Get all orders for a user"""
+def iter_user_orders(telegram_user_id: int) -> Iterator[Order]:
+    """Yield all orders for a user one row at a time"""
     with get_db_connection() as conn:
         cursor = conn.cursor()
+        cursor.row_factory = _record_factory(Order)
         cursor.execute("""
-            SELECT o.*, dp.name as profile_name
+            SELECT o.id, o.telegram_user_id, o.profile_id, o.service_type, o.amount,
+                   o.currency, o.payment_method, o.payment_wallet, o.status,
+                   o.created_at, o.confirmed_at, o.details,
+                   dp.name as profile_name
             FROM orders o
             LEFT JOIN dating_profiles dp ON o.profile_id = dp.id
             WHERE o.telegram_user_id = ?
             ORDER BY o.created_at DESC
         """, (telegram_user_id,))
-        orders = cursor.fetchall()
-        return [dict(o) for o in orders]
+        yield from cursor
+
+
+def get_user_orders(telegram_user_id: int) -> List[Dict]:
+    """Get all orders for a user"""
+    return [order._asdict() for order in iter_user_orders(telegram_user_id)]
 
 
 def add_comment(comment_data: Dict) -> int:
     """Add new comment"""
-    from datetime import datetime
     with get_db_connection() as conn:
         cursor = conn.cursor()
         cursor.execute("""
@@ -888,32 +999,38 @@ def add_comment(comment_data: Dict) -> int:
         """, (
             comment_data['profile_id'], comment_data.get('telegram_user_id'),
             comment_data.get('author_name'), comment_data['rating'],
-            comment_data.get('comment'), datetime.now().isoformat(),
+            comment_data.get('comment'), _now_iso(),
             comment_data.get('visible', 1)
         ))
         return cursor.lastrowid
 
 
-def get_profile_comments(profile_id: int) -> List[Dict]:
-    """Get comments for a profile"""
+def iter_profile_comments(profile_id: int) -> Iterator[Comment]:
+    """Yield comments for a profile one row at a time"""
     with get_db_connection() as conn:
         cursor = conn.cursor()
+        cursor.row_factory = _record_factory(Comment)
         cursor.execute("""
-            SELECT * FROM comments
+            SELECT id, profile_id, telegram_user_id, author_name, rating,
+                   comment, created_at, visible
+            FROM comments
             WHERE profile_id = ? AND visible = 1
             ORDER BY created_at DESC
         """, (profile_id,))
-        comments = cursor.fetchall()
-        return [dict(c) for c in comments]
+        yield from cursor
 
 
-def get_promocode_by_code(code: str) -> Optional[Dict]:
-    """Get promocode by code"""
-    with get_db_connection() as conn:
+def get_profile_comments(profile_id: int) -> List[Dict]:
+    """Get comments for a profile"""
+    return [comment._asdict() for comment in iter_profile_comments(profile_id)]
+
+
+def get_promocode_by_code(code: str) -> Optional[sqlite3.Row]:
+    """Get promocode by code (as sqlite3.Row)"""
+    with get_read_connection() as conn:
         cursor = conn.cursor()
         cursor.execute("SELECT * FROM promocodes WHERE code = ? AND active = 1", (code,))
-        promo = cursor.fetchone()
-        return dict(promo) if promo else None
+        return cursor.fetchone()
 
 
 def get_app_setting(key: str) -> Optional[str]:
@@ -927,13 +1044,13 @@ def get_app_setting(key: str) -> Optional[str]:
 
 def set_app_setting(key: str, value: str):
     """Set app setting"""
-    from datetime import datetime
     with get_db_connection() as conn:
         cursor = conn.cursor()
         cursor.execute("""
-            INSERT OR REPLACE INTO app_settings (key, value, updated_at)
+            INSERT INTO app_settings (key, value, updated_at)
             VALUES (?, ?, ?)
-        """, (key, value, datetime.now().isoformat()))
+            ON CONFLICT(key) DO UPDATE SET value = excluded.value, updated_at = excluded.updated_at
+        """, (key, value, _now_iso()))
 
 
 # ==================== SESSION MANAGEMENT ====================
@@ -941,31 +1058,40 @@ def set_app_setting(key: str, value: str):
 def create_session(session_id: str, telegram_id: int, user_data: dict, expires_at: str) -> bool:
     """
     Create new session in database
-    Returns True on success
+    Returns True on success, False if session_id already exists
+    (other database errors propagate)
     """
-    import json
     with get_db_connection() as conn:
         cursor = conn.cursor()
-        try:
-            cursor.execute("""
-                INSERT INTO sessions (session_id, telegram_id, user_data, expires_at)
-                VALUES (?, ?, ?, ?)
-            """, (session_id, telegram_id, json.dumps(user_data), expires_at))
-            logger.info(f"✅ Session created: {session_id} (user: {telegram_id})")
-            return True
-        except Exception as e:
-            logger.error(f"❌ Error creating session: {e}")
+        cursor.execute("""
+            INSERT INTO sessions (session_id, telegram_id, user_data, expires_at)
+            VALUES (?, ?, ?, ?)
+            ON CONFLICT(session_id) DO NOTHING
+            RETURNING 1
+        """, (session_id, telegram_id, orjson.dumps(user_data), expires_at))
+
+        if cursor.fetchone() is None:
+            logger.warning(f"⚠️ Session already exists: {session_id}")
             return False
 
+        logger.info(f"✅ Session created: {session_id} (user: {telegram_id})")
+        return True
+
 
 def get_session(session_id: str) -> Optional[Dict[str, Any]]:
     """
     Get session from database
     Returns user_data dict or None if not found/expired
     """
-    import json
-    from datetime import datetime
-    
+    entry = get_session_entry(session_id)
+    return entry[0] if entry is not None else None
+
+
+def get_session_entry(session_id: str) -> Optional[Tuple[Dict[str, Any], datetime]]:
+    """
+    Get session from database together with its expiry
+    Returns (user_data, expires_at) or None if not found/expired
+    """
     with get_db_connection() as conn:
         cursor = conn.cursor()
         cursor.execute("""
@@ -977,12 +1103,10 @@ def get_session(session_id: str) -> Optional[Dict[str, Any]]:
         if not result:
             return None
         
-        # Проверяем истечение
+        # Проверяем истечение (удаление делает фоновая очистка)
         expires_at = datetime.fromisoformat(result['expires_at'])
         if datetime.now() > expires_at:
-            # Удаляем истекшую сессию
-            cursor.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
-            logger.info(f"🗑️ Expired session deleted: {session_id}")
+            logger.debug(f"Expired session rejected: {session_id}")
             return None
         
         # Обновляем last_activity
@@ -991,8 +1115,8 @@ def get_session(session_id: str) -> Optional[Dict[str, Any]]:
             WHERE session_id = ?
         """, (session_id,))
         
-        user_data = json.loads(result['user_data'])
-        return user_data
+        user_data = orjson.loads(result['user_data'])
+        return user_data, expires_at
 
 
 def delete_session(session_id: str) -> bool:
@@ -1015,9 +1139,48 @@ def cleanup_expired_sessions():
     """
     with get_db_connection() as conn:
         cursor = conn.cursor()
-        cursor.execute("DELETE FROM sessions WHERE expires_at < CURRENT_TIMESTAMP")
-        if cursor.rowcount > 0:
-            logger.info(f"🗑️ Cleaned up {cursor.rowcount} expired sessions")
+        # expires_at is written as a local ISO timestamp, compare in the same format
+        cursor.execute("DELETE FROM sessions WHERE expires_at < ?", (_now_iso(),))
+        deleted = cursor.rowcount
+        if deleted > 0:
+            # Commit first: a checkpoint cannot include the still-open write
+            conn.commit()
+            # Truncate the WAL so readers don't scan freed pages (no-op outside WAL mode)
+            cursor.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            logger.info(f"🗑️ Cleaned up {deleted} expired sessions")
+
+
+SESSION_CLEANUP_INTERVAL = 60  # seconds
+_session_cleanup_thread = None
+
+
+def _session_cleanup_loop(interval: int):
+    """Periodically delete expired sessions off the request path"""
+    while True:
+        time.sleep(interval)
+        try:
+            cleanup_expired_sessions()
+        except Exception as e:
+            logger.error(f"❌ Error cleaning up expired sessions: {e}")
+
+
+def start_session_cleanup(interval: int = SESSION_CLEANUP_INTERVAL):
+    """
+    Start the background session cleanup thread
+    Safe to call more than once; only one thread is started
+    """
+    global _session_cleanup_thread
+    if _session_cleanup_thread is not None and _session_cleanup_thread.is_alive():
+        return
+
+    _session_cleanup_thread = threading.Thread(
+        target=_session_cleanup_loop,
+        args=(interval,),
+        name="session-cleanup",
+        daemon=True
+    )
+    _session_cleanup_thread.start()
+    logger.info(f"🧹 Session cleanup thread started (every {interval}s)")
 
 
 # Initialize database on module import
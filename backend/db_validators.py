@@ -1,13 +1,17 @@
 """
 Database Validators and Safety Functions
 Provides additional validation layer for database operations
+
+The integrity check is no longer run on import. Run it on demand with:
+    python db_validators.py
 """
 
 import sqlite3
+import os
 import logging
 from typing import Optional, Dict, Any
 from contextlib import contextmanager
-from database import DATABASE_PATH
+from database import DATABASE_PATH, get_read_connection
 
 logger = logging.getLogger(__name__)
 
@@ -63,16 +67,16 @@ def check_telegram_id_unique(telegram_id: int) -> bool:
     Returns:
         True if unique (not exists), False if already exists
     """
-    with get_db_connection() as conn:
+    with get_read_connection() as conn:
         cursor = conn.cursor()
         cursor.execute("""
-            SELECT COUNT(*) as count
+            SELECT 1
             FROM users
             WHERE telegram_id = ?
+            LIMIT 1
         """, (telegram_id,))
 
-        count = cursor.fetchone()['count']
-        return count == 0
+        return cursor.fetchone() is None
 
 
 def verify_user_ownership(user_id: int, telegram_id: int) -> bool:
@@ -87,32 +91,34 @@ def verify_user_ownership(user_id: int, telegram_id: int) -> bool:
     Returns:
         True if user_id belongs to telegram_id, False otherwise
     """
-    with get_db_connection() as conn:
+    with get_read_connection() as conn:
         cursor = conn.cursor()
         cursor.execute("""
             SELECT telegram_id
             FROM users
             WHERE id = ?
         """, (user_id,))
-
         user = cursor.fetchone()
-        if not user:
-            logger.error(f"User ID {user_id} not found")
-            return False
 
-        if user['telegram_id'] != telegram_id:
-            logger.error(
-                f"Ownership violation: user_id {user_id} has telegram_id {user['telegram_id']}, "
-                f"but {telegram_id} was provided"
-            )
-            return False
+    if not user:
+        logger.error(f"User ID {user_id} not found")
+        return False
+    owner_telegram_id = user['telegram_id']
 
-        return True
+    if owner_telegram_id != telegram_id:
+        logger.error(
+            f"Ownership violation: user_id {user_id} has telegram_id {owner_telegram_id}, "
+            f"but {telegram_id} was provided"
+        )
+        return False
 
+    return True
 
-def verify_file_ownership(file_id: int, telegram_id: int) -> bool:
+
+def verify_file_access(file_id: int, telegram_id: int) -> bool:
     """
-    Verify that file belongs to the user
+    Verify that file belongs to the user and that the file's owning
+    user record matches the same telegram_id, in a single query
 
     Args:
         file_id: File ID to check
@@ -121,12 +127,13 @@ def verify_file_ownership(file_id: int, telegram_id: int) -> bool:
     Returns:
         True if file belongs to user, False otherwise
     """
-    with get_db_connection() as conn:
+    with get_read_connection() as conn:
         cursor = conn.cursor()
         cursor.execute("""
-            SELECT telegram_user_id
-            FROM files
-            WHERE id = ?
+            SELECT f.telegram_user_id, u.telegram_id AS owner_telegram_id
+            FROM files f
+            LEFT JOIN users u ON f.user_id = u.id
+            WHERE f.id = ?
         """, (file_id,))
 
         file = cursor.fetchone()
@@ -141,9 +148,31 @@ def verify_file_ownership(file_id: int, telegram_id: int) -> bool:
             )
             return False
 
+        if file['owner_telegram_id'] != telegram_id:
+            logger.error(
+                f"Ownership violation: file {file_id} is linked to a user with telegram_id "
+                f"{file['owner_telegram_id']}, but {telegram_id} was provided"
+            )
+            return False
+
         return True
 
 
+def verify_file_ownership(file_id: int, telegram_id: int) -> bool:
+    """
+    Verify that file belongs to the user
+    Kept for backward compatibility, see verify_file_access
+
+    Args:
+        file_id: File ID to check
+        telegram_id: Telegram ID of the user
+
+    Returns:
+        True if file belongs to user, False otherwise
+    """
+    return verify_file_access(file_id, telegram_id)
+
+
 def get_user_file_count(telegram_id: int) -> int:
     """
     Get total number of files for a user
@@ -154,7 +183,7 @@ def get_user_file_count(telegram_id: int) -> int:
     Returns:
         Number of files owned by user
     """
-    with get_db_connection() as conn:
+    with get_read_connection() as conn:
         cursor = conn.cursor()
         cursor.execute("""
             SELECT COUNT(*) as count
@@ -183,61 +212,86 @@ def check_database_integrity() -> Dict[str, Any]:
     with get_db_connection() as conn:
         cursor = conn.cursor()
 
-        # Check for duplicate telegram_ids (should be impossible with UNIQUE constraint)
+        # All four checks touch only users/files, so run them as one statement
+        # tagged by issue type instead of four separate scans.
+        #   dup      - duplicate telegram_ids (should be impossible with UNIQUE constraint)
+        #   null     - NULL telegram_ids (should be impossible with NOT NULL constraint)
+        #   orphan   - files without valid user_id
+        #   mismatch - files with mismatched user associations
         cursor.execute("""
-            SELECT telegram_id, COUNT(*) as count
+            SELECT 'dup' AS issue, NULL AS id, telegram_id, COUNT(*) AS count,
+                   NULL AS username, NULL AS first_name, NULL AS last_name,
+                   NULL AS filename, NULL AS user_id, NULL AS telegram_user_id,
+                   NULL AS actual_telegram_id
             FROM users
             WHERE telegram_id IS NOT NULL
             GROUP BY telegram_id
             HAVING COUNT(*) > 1
-        """)
-        duplicates = cursor.fetchall()
-        if duplicates:
-            results['duplicate_telegram_ids'] = [
-                {'telegram_id': d['telegram_id'], 'count': d['count']}
-                for d in duplicates
-            ]
-            results['is_valid'] = False
-            logger.error(f"Found {len(duplicates)} duplicate telegram_ids!")
-
-        # Check for NULL telegram_ids (should be impossible with NOT NULL constraint)
-        cursor.execute("""
-            SELECT id, username, first_name, last_name
+
+            UNION ALL
+
+            SELECT 'null', id, NULL, NULL, username, first_name, last_name,
+                   NULL, NULL, NULL, NULL
             FROM users
             WHERE telegram_id IS NULL
-        """)
-        null_ids = cursor.fetchall()
-        if null_ids:
-            results['null_telegram_ids'] = [dict(u) for u in null_ids]
-            results['is_valid'] = False
-            logger.error(f"Found {len(null_ids)} users with NULL telegram_id!")
 
-        # Check for orphaned files (files without valid user_id)
-        cursor.execute("""
-            SELECT f.id, f.filename, f.user_id
+            UNION ALL
+
+            SELECT 'orphan', f.id, NULL, NULL, NULL, NULL, NULL,
+                   f.filename, f.user_id, NULL, NULL
             FROM files f
             LEFT JOIN users u ON f.user_id = u.id
             WHERE u.id IS NULL
-        """)
-        orphaned = cursor.fetchall()
-        if orphaned:
-            results['orphaned_files'] = [dict(f) for f in orphaned]
-            results['is_valid'] = False
-            logger.error(f"Found {len(orphaned)} orphaned files!")
 
-        # Check for files with mismatched user associations
-        cursor.execute("""
-            SELECT f.id, f.filename, f.user_id, f.telegram_user_id,
-                   u.telegram_id as actual_telegram_id
+            UNION ALL
+
+            SELECT 'mismatch', f.id, NULL, NULL, NULL, NULL, NULL,
+                   f.filename, f.user_id, f.telegram_user_id, u.telegram_id
             FROM files f
-            LEFT JOIN users u ON f.user_id = u.id
+            JOIN users u ON f.user_id = u.id
             WHERE u.telegram_id != f.telegram_user_id
         """)
-        mismatched = cursor.fetchall()
-        if mismatched:
-            results['mismatched_file_owners'] = [dict(f) for f in mismatched]
-            results['is_valid'] = False
-            logger.error(f"Found {len(mismatched)} files with mismatched owners!")
+
+        for row in cursor:
+            issue = row['issue']
+            if issue == 'dup':
+                results['duplicate_telegram_ids'].append(
+                    {'telegram_id': row['telegram_id'], 'count': row['count']}
+                )
+            elif issue == 'null':
+                results['null_telegram_ids'].append({
+                    'id': row['id'],
+                    'username': row['username'],
+                    'first_name': row['first_name'],
+                    'last_name': row['last_name']
+                })
+            elif issue == 'orphan':
+                results['orphaned_files'].append({
+                    'id': row['id'],
+                    'filename': row['filename'],
+                    'user_id': row['user_id']
+                })
+            else:
+                results['mismatched_file_owners'].append({
+                    'id': row['id'],
+                    'filename': row['filename'],
+                    'user_id': row['user_id'],
+                    'telegram_user_id': row['telegram_user_id'],
+                    'actual_telegram_id': row['actual_telegram_id']
+                })
+
+    if results['duplicate_telegram_ids']:
+        results['is_valid'] = False
+        logger.error(f"Found {len(results['duplicate_telegram_ids'])} duplicate telegram_ids!")
+    if results['null_telegram_ids']:
+        results['is_valid'] = False
+        logger.error(f"Found {len(results['null_telegram_ids'])} users with NULL telegram_id!")
+    if results['orphaned_files']:
+        results['is_valid'] = False
+        logger.error(f"Found {len(results['orphaned_files'])} orphaned files!")
+    if results['mismatched_file_owners']:
+        results['is_valid'] = False
+        logger.error(f"Found {len(results['mismatched_file_owners'])} files with mismatched owners!")
 
     return results
 
@@ -284,9 +338,14 @@ def enforce_constraints():
             raise
 
 
-# Auto-run integrity check on import (only in development)
-import os
-if os.getenv('ENVIRONMENT', 'development') == 'development' and os.path.exists(DATABASE_PATH):
+def main():
+    """Run the database integrity check from the command line"""
+    logging.basicConfig(level=logging.INFO)
+
+    if not os.path.exists(DATABASE_PATH):
+        logger.info(f"Database not found at {DATABASE_PATH}, nothing to check")
+        return
+
     logger.info("Running database integrity check...")
     results = check_database_integrity()
     if not results['is_valid']:
@@ -296,3 +355,7 @@ if os.getenv('ENVIRONMENT', 'development') == 'development' and os.path.exists(D
                 logger.error(f"  {issue_type}: {len(issues)} issues")
     else:
         logger.info("✅ Database integrity check passed")
+
+
+if __name__ == "__main__":
+    main()
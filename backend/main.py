@@ -1,23 +1,37 @@
 from fastapi import FastAPI, HTTPException, UploadFile, File, Form, Request, Response, Depends
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, ORJSONResponse
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
 import uvicorn
 import os
 import json
 import shutil
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import List, Optional, Tuple
 import random
 import string
 import asyncio
+import bisect
+import collections
+import contextlib
+import copy
+import functools
+import gzip
+from collections import OrderedDict
 import logging
+import operator
 import hashlib
 import hmac
-import uuid
-from urllib.parse import parse_qs
+import itertools
+import secrets
+import ssl
+import tempfile
+from urllib.parse import parse_qsl
 from dotenv import load_dotenv
+import orjson
 import database as db  # Using unified database instead of data.json
+import data_ids
 import time
 import threading
 import requests
@@ -31,18 +45,32 @@ load_dotenv(os.path.join(current_dir, ".env"))
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-app = FastAPI(title="Muji - Anonymous Dating", version="15.0.0")
+# Ответы сериализуются orjson; крупные списки (анкеты, чаты, заказы) отдаются
+# как ORJSONResponse напрямую, минуя обход jsonable_encoder — данные уже
+# состоят только из JSON-типов, прочитанных из data.json
+app = FastAPI(title="Muji - Anonymous Dating", version="15.0.0", default_response_class=ORJSONResponse)
+
+# CORS: явный список origins (Telegram WebApp) + ngrok-туннели по шаблону.
+# С allow_credentials браузеры не принимают "*", а фиксированный список
+# позволяет кэшировать preflight (max_age)
+FRONTEND_ORIGINS_STR = os.getenv("FRONTEND_ORIGINS", "https://web.telegram.org")
+FRONTEND_ORIGINS = [origin.strip() for origin in FRONTEND_ORIGINS_STR.split(",") if origin.strip()]
+FRONTEND_ORIGIN_REGEX = os.getenv("FRONTEND_ORIGIN_REGEX", r"https://[a-z0-9-]+\.ngrok-free\.app")
 
-# Разрешаем CORS (включая ngrok и Telegram WebApp)
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=["*"],  # Разрешаем все origins для ngrok и Telegram WebApp
+    allow_origins=FRONTEND_ORIGINS,
+    allow_origin_regex=FRONTEND_ORIGIN_REGEX or None,
     allow_credentials=True,
     allow_methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"],
     allow_headers=["Content-Type", "Authorization", "X-Requested-With"],
     expose_headers=["Set-Cookie"],
+    max_age=86400,
 )
 
+# Сжимаем ответы больше 1 КБ (index.html, manifest, JSON со списками анкет)
+app.add_middleware(GZipMiddleware, minimum_size=1024)
+
 # Пути
 frontend_dir = os.path.join(current_dir, "../frontend")
 DATA_FILE = os.path.join(current_dir, "data.json")  # Legacy data file
@@ -75,16 +103,127 @@ _secure_cookie = not _is_dev
 if not TELEGRAM_BOT_TOKEN:
     logger.warning("⚠️ TELEGRAM_BOT_TOKEN not available")
 
-# Session storage moved to database (no longer in-memory)
+# secret_key = HMAC-SHA256("WebAppData", bot_token) — константа на время жизни процесса
+_TG_SECRET_KEY = hmac.digest(b"WebAppData", TELEGRAM_BOT_TOKEN.encode(), "sha256")
+
+logger.info(f"🔐 HMAC backend: {ssl.OPENSSL_VERSION}")
+
+class _TTLCache:
+    """Потокобезопасный LRU-кеш с TTL на OrderedDict (cachetools не используем)"""
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[object, Tuple[float, object]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def put(self, key, value) -> None:
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+# Кеш проверенных initData: sha256(init_data) -> (is_valid, auth_timestamp).
+# Mini App шлёт один и тот же initData на каждый запрос до перезагрузки,
+# поэтому HMAC достаточно посчитать один раз. Свежесть (max_age_seconds)
+# перепроверяется при каждом обращении. Кеш привязан к _TG_SECRET_KEY —
+# при смене токена его нужно сбросить (clear_telegram_auth_cache).
+TG_AUTH_CACHE_MAXSIZE = 10_000
+TG_AUTH_CACHE_TTL = 300  # секунд
+_tg_auth_cache = _TTLCache(TG_AUTH_CACHE_MAXSIZE, TG_AUTH_CACHE_TTL)
+
+
+def clear_telegram_auth_cache() -> None:
+    """Сбросить кеш проверенных initData (например, после смены токена бота)"""
+    _tg_auth_cache.clear()
+
+
+# Сессии хранятся в SQLite; перед ней — короткий in-process кеш
+# session_id -> (user_data, expires_at), чтобы авторизованный запрос не ходил в БД.
+# Срок сессии проверяется и при попадании в кеш. TTL небольшой: сессию может
+# удалить другой процесс (admin.py), и такое удаление будет замечено не позже
+# чем через TTL; last_activity в БД обновляется на промахе — не реже раза за TTL.
+SESSION_CACHE_MAXSIZE = 10_000
+SESSION_CACHE_TTL = 60  # секунд
+_session_cache = _TTLCache(SESSION_CACHE_MAXSIZE, SESSION_CACHE_TTL)
+
 
 
-def verify_telegram_auth(init_data: str, max_age_seconds: int = 86400) -> bool:
+def _check_telegram_signature(init_data: str,
+                              pairs: Optional[List[Tuple[str, str]]] = None) -> Tuple[bool, int]:
+    """
+    HMAC-проверка initData без учёта свежести
+
+    Returns:
+        (is_valid, auth_timestamp) — auth_timestamp равен 0 для невалидных данных
+    """
+    if pairs is None:
+        pairs = parse_qsl(init_data, keep_blank_values=True)
+    received_hash = next((v for k, v in pairs if k == 'hash'), '')
+
+    if not received_hash:
+        logger.warning("⚠️ Missing hash in Telegram auth data")
+        return False, 0
+
+    # Формируем строку для проверки за один проход по отсортированным парам
+    data_check_string = '\n'.join(
+        f"{k}={v}" for k, v in sorted(p for p in pairs if p[0] != 'hash')
+    )
+
+    # Вычисляем hash согласно официальной документации Telegram
+    # Step 1 (secret_key) вычислен один раз при импорте: _TG_SECRET_KEY
+    # Step 2: hash = HMAC-SHA256(data_check_string, secret_key)
+    # hmac.digest() — одноразовый C-путь OpenSSL без Python-объекта HMAC
+    calculated_hash = hmac.digest(_TG_SECRET_KEY, data_check_string.encode(), "sha256").hex()
+
+    # Проверка подлинности хеша (защита от атак по времени)
+    if not hmac.compare_digest(calculated_hash, received_hash):
+        logger.warning("⚠️ Invalid hash in Telegram auth data")
+        return False, 0
+
+    auth_date = next((v for k, v in pairs if k == 'auth_date'), '0')
+    try:
+        return True, int(auth_date)
+    except (ValueError, TypeError):
+        logger.warning("⚠️ Invalid auth_date in Telegram auth data")
+        return False, 0
+
+
+def verify_telegram_auth(init_data: str, max_age_seconds: int = 86400,
+                         pairs: Optional[List[Tuple[str, str]]] = None) -> bool:
     """
     Проверка подлинности данных от Telegram Web App
 
     Args:
         init_data: Строка initData от Telegram WebApp
         max_age_seconds: Максимальный возраст данных в секундах (по умолчанию 24 часа)
+        pairs: Уже разобранные пары parse_qsl(init_data), чтобы вызывающий код
+            не парсил initData второй раз
 
     Returns:
         True если данные валидны и не устарели, иначе False
@@ -94,52 +233,24 @@ def verify_telegram_auth(init_data: str, max_age_seconds: int = 86400) -> bool:
         return False
 
     try:
-        parsed_data = parse_qs(init_data)
-        received_hash = parsed_data.get('hash', [''])[0]
-
-        if not received_hash:
-            logger.warning("⚠️ Missing hash in Telegram auth data")
-            return False
+        # Повторный initData проверяется по кешу — без HMAC
+        cache_key = hashlib.sha256(init_data.encode()).digest()
+        cached = _tg_auth_cache.get(cache_key)
+        if cached is None:
+            is_valid, auth_timestamp = _check_telegram_signature(init_data, pairs)
+            _tg_auth_cache.put(cache_key, (is_valid, auth_timestamp))
+        else:
+            is_valid, auth_timestamp = cached
+            if not is_valid:
+                logger.warning("⚠️ Invalid Telegram auth data (cached)")
 
-        # Формируем строку для проверки
-        data_check_arr = []
-        for key, value in sorted(parsed_data.items()):
-            if key != 'hash':
-                data_check_arr.append(f"{key}={value[0]}")
-
-        data_check_string = '\n'.join(data_check_arr)
-
-        # Вычисляем hash согласно официальной документации Telegram
-        # Step 1: secret_key = HMAC-SHA256("WebAppData", bot_token)
-        secret_key = hmac.new(
-            "WebAppData".encode(),
-            TELEGRAM_BOT_TOKEN.encode(),
-            hashlib.sha256
-        ).digest()
-
-        # Step 2: hash = HMAC-SHA256(data_check_string, secret_key)
-        calculated_hash = hmac.new(
-            secret_key,
-            data_check_string.encode(),
-            hashlib.sha256
-        ).hexdigest()
-
-        # Проверка подлинности хеша (защита от атак по времени)
-        if not hmac.compare_digest(calculated_hash, received_hash):
-            logger.warning("⚠️ Invalid hash in Telegram auth data")
+        if not is_valid:
             return False
 
         # Проверка свежести данных (защита от повторных атак)
-        auth_date = parsed_data.get('auth_date', ['0'])[0]
-        try:
-            auth_timestamp = int(auth_date)
-            current_timestamp = int(datetime.now().timestamp())
-
-            if current_timestamp - auth_timestamp > max_age_seconds:
-                logger.warning(f"⚠️ Telegram auth data too old: {current_timestamp - auth_timestamp} seconds")
-                return False
-        except (ValueError, TypeError):
-            logger.warning("⚠️ Invalid auth_date in Telegram auth data")
+        current_timestamp = int(time.time())
+        if current_timestamp - auth_timestamp > max_age_seconds:
+            logger.warning(f"⚠️ Telegram auth data too old: {current_timestamp - auth_timestamp} seconds")
             return False
 
         return True
@@ -150,51 +261,67 @@ def verify_telegram_auth(init_data: str, max_age_seconds: int = 86400) -> bool:
 
 def create_telegram_session(user_data: dict) -> str:
     """Create new Telegram user session in database"""
-    session_id = str(uuid.uuid4())
+    session_id = secrets.token_urlsafe(16)  # 128 бит, URL-safe
     expires_at = (datetime.now() + timedelta(days=30)).isoformat()
     
-    db.create_session(
+    created = db.create_session(
         session_id=session_id,
         telegram_id=user_data.get("telegram_id"),
         user_data=user_data,
         expires_at=expires_at
     )
+    # Не выдаём и не кешируем сессию, которой нет в БД
+    if not created:
+        raise RuntimeError("Session could not be created")
+    _session_cache.put(session_id, (user_data, datetime.fromisoformat(expires_at)))
     
     return session_id
 
 
-def verify_telegram_session(session_id: str) -> bool:
-    """Verify Telegram session validity (checks database)"""
-    if not session_id:
-        return False
-    user_data = db.get_session(session_id)
-    return user_data is not None
-
-
 def get_telegram_session_user(session_id: str) -> Optional[dict]:
-    """Get Telegram user data from session (from database)"""
-    return db.get_session(session_id)
+    """Get Telegram user data from session (cache, then database)"""
+    entry = _session_cache.get(session_id)
+    if entry is None:
+        entry = db.get_session_entry(session_id)
+        if entry is None:
+            return None
+        _session_cache.put(session_id, entry)
+
+    user_data, expires_at = entry
+    if datetime.now() > expires_at:
+        _session_cache.pop(session_id)
+        return None
+    return user_data
 
 
 def destroy_telegram_session(session_id: str):
     """Destroy Telegram session in database"""
+    _session_cache.pop(session_id)
     db.delete_session(session_id)
 
 
-async def get_telegram_user(request: Request):
+def _request_telegram_user(request: Request) -> Optional[dict]:
     """
-    Get current Telegram user from session
-    This dependency is used for Telegram Mini App endpoints
+    Пользователь текущего запроса: сессия ищется не более одного раза за запрос,
+    результат (включая None) запоминается в request.state
     """
+    if hasattr(request.state, "telegram_user"):
+        return request.state.telegram_user
+
     session_id = request.cookies.get("telegram_session")
+    user_data = get_telegram_session_user(session_id) if session_id else None
+    request.state.telegram_user = user_data or None
+    return request.state.telegram_user
 
-    if not session_id or not verify_telegram_session(session_id):
-        raise HTTPException(status_code=401, detail="Telegram authentication required")
 
-    user_data = get_telegram_session_user(session_id)
+async def get_telegram_user(request: Request):
+    """
+    Get current Telegram user from session
+    This dependency is used for Telegram Mini App endpoints
+    """
+    user_data = _request_telegram_user(request)
     if not user_data:
-        raise HTTPException(status_code=401, detail="Invalid Telegram session")
-
+        raise HTTPException(status_code=401, detail="Telegram authentication required")
     return user_data
 
 
@@ -203,46 +330,117 @@ async def get_telegram_user_optional(request: Request) -> Optional[dict]:
     Get Telegram user if authenticated, None otherwise
     For endpoints that work with or without authentication
     """
-    session_id = request.cookies.get("telegram_session")
-    if session_id and verify_telegram_session(session_id):
-        return get_telegram_session_user(session_id)
-    return None
+    return _request_telegram_user(request)
 
 
 # ============= END TELEGRAM AUTHENTICATION =============
 
 # Генерация случайного 18-значного кода для ордеров
+_ORDER_CODE_CHARS = string.ascii_letters + string.digits  # a-z, A-Z, 0-9
+_ORDER_CODE_LENGTH = 18
+_ORDER_CODE_SPACE = len(_ORDER_CODE_CHARS) ** _ORDER_CODE_LENGTH
+
+
 def generate_order_code():
-    """Генерирует случайный 18-значный код из букв и цифр"""
-    characters = string.ascii_letters + string.digits  # a-z, A-Z, 0-9
-    return ''.join(random.choice(characters) for _ in range(18))
+    """
+    Генерирует случайный 18-значный код из букв и цифр
 
-# Фоновая задача для удаления просроченных заказов
-async def cleanup_expired_orders():
-    """Удаляет заказы, которые не оплачены в течение 1 часа"""
+    Одно криптостойкое число из всего пространства кодов раскладывается
+    по основанию 62 — вместо 18 вызовов random.choice.
+    """
+    n = secrets.randbelow(_ORDER_CODE_SPACE)
+    chars = []
+    for _ in range(_ORDER_CODE_LENGTH):
+        n, r = divmod(n, 62)
+        chars.append(_ORDER_CODE_CHARS[r])
+    return ''.join(chars)
+
+# ============= ФОНОВЫЕ ЗАДАЧИ =============
+
+# Ссылки на все фоновые задачи: без них asyncio может собрать задачу GC,
+# а при остановке их нечем отменить
+_background_tasks: "set[asyncio.Task]" = set()
+
+
+def _on_background_task_done(task: asyncio.Task) -> None:
+    """Убирает задачу из реестра и логирует необработанное исключение"""
+    _background_tasks.discard(task)
+    if task.cancelled():
+        return
+    exc = task.exception()
+    if exc is not None:
+        logger.error(f"❌ Background task {task.get_name()} failed: {exc!r}")
+
+
+def spawn_background(coro, name: Optional[str] = None) -> asyncio.Task:
+    """Запускает корутину в фоне с отслеживанием задачи"""
+    task = asyncio.create_task(coro, name=name)
+    _background_tasks.add(task)
+    task.add_done_callback(_on_background_task_done)
+    return task
+
+
+async def cancel_background_tasks() -> None:
+    """Отменяет все фоновые задачи и дожидается их завершения"""
+    tasks = list(_background_tasks)
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+
+async def run_periodic(func, interval: float, name: str) -> None:
+    """
+    Вызывает func каждые interval секунд по монотонным часам
+
+    Следующий запуск отсчитывается от плановой точки, а не от конца
+    предыдущего, поэтому интервал не «уплывает». Пропущенные тики
+    схлопываются в один, запуски никогда не перекрываются.
+    """
+    loop = asyncio.get_running_loop()
+    next_run = loop.time()
     while True:
         try:
-            data = load_data()
-            now = datetime.now()
-
-            # Фильтруем только непросроченные или оплаченные заказы
-            initial_count = len(data.get("orders", []))
-            data["orders"] = [
-                o for o in data.get("orders", [])
-                if o.get("status") != "unpaid" or
-                   (o.get("expires_at") and datetime.fromisoformat(o["expires_at"]) > now)
-            ]
+            result = func()
+            if asyncio.iscoroutine(result):
+                await result
+        except Exception as e:
+            logger.error(f"❌ Periodic job {name} failed: {e}")
 
-            deleted_count = initial_count - len(data["orders"])
-            if deleted_count > 0:
-                save_data(data)
-                logger.info(f"🗑️ Cleaned up {deleted_count} expired unpaid orders")
+        next_run += interval
+        now = loop.time()
+        if next_run < now:
+            # Пропустили один или несколько тиков — запускаем один раз, без догонялок
+            next_run = now + interval
+        await asyncio.sleep(next_run - now)
 
-            # Проверяем каждые 60 секунд
-            await asyncio.sleep(60)
-        except Exception as e:
-            logger.error(f"❌ Error cleaning up expired orders: {e}")
-            await asyncio.sleep(60)
+
+# Фоновая задача для удаления просроченных заказов
+ORDER_CLEANUP_INTERVAL = 60  # секунд
+
+
+async def cleanup_expired_orders_once() -> int:
+    """Удаляет заказы, которые не оплачены в течение 1 часа. Возвращает число удалённых"""
+    # Чтение и запись data.json (с fsync) — в потоке, не блокируя event loop
+    data = await load_data_async()
+    now = datetime.now()
+
+    # Фильтруем только непросроченные или оплаченные заказы. expires_at
+    # разбирается: admin.py и старые данные могут писать его в другом
+    # формате или с другой точностью, строковое сравнение тут ненадёжно
+    orders = data.get("orders", [])
+    kept = [
+        o for o in orders
+        if o.get("status") != "unpaid" or
+           (o.get("expires_at") and datetime.fromisoformat(o["expires_at"]) > now)
+    ]
+
+    deleted_count = len(orders) - len(kept)
+    if deleted_count > 0:
+        data["orders"] = kept
+        mark_data_changed()
+        await save_data_async(data)
+        logger.info(f"🗑️ Cleaned up {deleted_count} expired unpaid orders")
+    return deleted_count
 
 # Запуск фоновых задач при старте
 @app.on_event("startup")
@@ -250,10 +448,21 @@ async def startup_event():
     """Запуск фоновых задач при старте приложения"""
     logger.info("🧹 Starting cleanup tasks...")
     
-    # Очищаем истекшие сессии
+    # Очищаем истекшие сессии сразу и далее периодически в фоновом потоке
     db.cleanup_expired_sessions()
+    db.start_session_cleanup()
     
-    asyncio.create_task(cleanup_expired_orders())
+    spawn_background(
+        run_periodic(cleanup_expired_orders_once, ORDER_CLEANUP_INTERVAL, "cleanup_expired_orders"),
+        name="cleanup_expired_orders"
+    )
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Корректная остановка фоновых задач"""
+    logger.info("🛑 Stopping background tasks...")
+    await cancel_background_tasks()
 
 # Раздаем статические файлы
 if os.path.exists(frontend_dir):
@@ -266,116 +475,156 @@ if os.path.exists(frontend_dir):
 # Раздаем загруженные файлы
 app.mount("/uploads", StaticFiles(directory=UPLOAD_DIR), name="uploads")
 
+# Значения по умолчанию для data.json — один экземпляр на модуль,
+# загрузчики берут из него глубокую копию
+_DEFAULT_SETTINGS: dict = {
+    "app": {
+        "app_name": "Muji",
+        "default_age": 25,
+        "default_city": "Moscow",
+        "vip_blurred_count": 3,
+        "extra_vip_blurred_count": 3,
+        "secret_blurred_count": 3
+    },
+    "crypto_wallets": {
+        "trc20": "TY76gU8J9o8j7U6tY5r4E3W2Q1",
+        "erc20": "0x8a9C6e5D8b0E2a1F3c4B6E7D8C9A0B1C2D3E4F5",
+        "bnb": "bnb1q3e5r7t9y1u3i5o7p9l1k3j5h7g9f2d4s6q8w0"
+    },
+    "banner": {
+        "text": "Special Offer: 15% discount with promo code WELCOME15",
+        "visible": True,
+        "link": "https://t.me/yourchannel",
+        "link_text": "Join Channel"
+    },
+    "vip_catalogs": {
+        "vip": {
+            "name": "VIP Catalog",
+            "price": 199,
+            "redirect_url": "https://t.me/vip_channel",
+            "visible": True,
+            "preview_count": 3,
+            "preview_profiles": [
+                {"name": "Anna", "age": 23, "city": "Moscow", "photo": ""},
+                {"name": "Sofia", "age": 21, "city": "Saint Petersburg", "photo": ""},
+                {"name": "Maria", "age": 25, "city": "Kazan", "photo": ""}
+            ]
+        },
+        "extra_vip": {
+            "name": "Extra VIP",
+            "price": 699,
+            "redirect_url": "https://t.me/extra_vip_channel",
+            "visible": True,
+            "preview_count": 3,
+            "preview_profiles": [
+                {"name": "Elena", "age": 22, "city": "Novosibirsk", "photo": ""},
+                {"name": "Victoria", "age": 24, "city": "Yekaterinburg", "photo": ""},
+                {"name": "Daria", "age": 20, "city": "Krasnoyarsk", "photo": ""}
+            ]
+        },
+        "secret": {
+            "name": "Secret Catalog",
+            "price": 2499,
+            "redirect_url": "https://t.me/secret_channel",
+            "visible": True,
+            "preview_count": 3,
+            "preview_profiles": [
+                {"name": "Anastasia", "age": 26, "city": "Vladivostok", "photo": ""},
+                {"name": "Polina", "age": 23, "city": "Rostov", "photo": ""},
+                {"name": "Alina", "age": 21, "city": "Sochi", "photo": ""}
+            ]
+        }
+    }
+}
+
+_DEFAULT_DATA: dict = {
+    "profiles": [],
+    "vip_profiles": [],
+    "chats": [],
+    "messages": [],
+    "comments": [],
+    "promocodes": [],
+    "orders": [],
+    "settings": _DEFAULT_SETTINGS
+}
+
 # Глобальный кэш данных и блокировка для синхронизации доступа
 _data_cache = None
 _cache_lock = threading.RLock()
-_cache_timestamp = 0
-_cache_ttl = 5  # Кэш действителен 5 секунд
+# Кэш действителен, пока у data.json те же (st_mtime_ns, st_size): файл
+# перечитывается только после реального изменения (в т.ч. из admin.py)
+_cache_stamp = None
+_STAMP_INVALID = object()  # после ошибки разбора — перечитать при следующем вызове
+# Версии данных: _data_version сбрасывает индексы (get_data_indexes),
+# _profiles_version — кэши по анкетам. main.py анкеты не меняет, поэтому
+# вторая растёт только при замене _data_cache (загрузка файла)
+_data_version = 0
+_profiles_version = 0
+_data_versions = itertools.count(1)  # next() атомарен под GIL, в отличие от += 1
+
+
+def mark_data_changed(profiles: bool = False):
+    """
+    Новая версия данных: индексы пересоберутся при следующем get_data_indexes.
+
+    Вызывается сразу при изменении dict (до любого await), а не после записи,
+    и только для изменений, которые index_appended не учитывает на месте
+    (список заменён, запись удалена). profiles=True — данные заменены целиком,
+    сбрасываются и кэши по анкетам.
+    """
+    global _data_version, _profiles_version
+    version = next(_data_versions)
+    _data_version = version
+    if profiles:
+        _profiles_version = version
+
+
+def _data_file_stamp():
+    """(st_mtime_ns, st_size) файла данных или None, если файла нет"""
+    try:
+        st = os.stat(DATA_FILE)
+    except FileNotFoundError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
 
 def load_data():
-    """Load data with caching to prevent concurrent access issues"""
-    global _data_cache, _cache_timestamp
-    
-    current_time = time.time()
+    """
+    Load data with caching to prevent concurrent access issues
+
+    Возвращает сам закэшированный dict без копирования. Изменённые данные
+    обязательно сохранять через save_data — он же заменяет кэш.
+    """
+    global _data_cache, _cache_stamp
     
-    # Быстрая проверка без блокировки (double-check locking)
-    if _data_cache is not None and (current_time - _cache_timestamp) < _cache_ttl:
-        return _data_cache.copy() if isinstance(_data_cache, dict) else _data_cache
+    # Быстрая проверка без блокировки (double-check locking): один stat()
+    stamp = _data_file_stamp()
+    if _data_cache is not None and stamp == _cache_stamp:
+        return _data_cache
     
     with _cache_lock:
         # Двойная проверка после получения блокировки
-        current_time_check = time.time()
-        if _data_cache is not None and (current_time_check - _cache_timestamp) < _cache_ttl:
-            return _data_cache.copy() if isinstance(_data_cache, dict) else _data_cache
+        stamp = _data_file_stamp()
+        if _data_cache is not None and stamp == _cache_stamp:
+            return _data_cache
         
         # Загружаем из файла
-        if not os.path.exists(DATA_FILE):
-            default_data = {
-                "profiles": [],
-                "vip_profiles": [],
-                "chats": [],
-                "messages": [],
-                "comments": [],
-                "promocodes": [],
-                "orders": [],
-                "settings": {
-                    "app": {
-                        "app_name": "Muji",
-                        "default_age": 25,
-                        "default_city": "Moscow",
-                        "vip_blurred_count": 3,
-                        "extra_vip_blurred_count": 3,
-                        "secret_blurred_count": 3
-                    },
-                    "crypto_wallets": {
-                        "trc20": "TY76gU8J9o8j7U6tY5r4E3W2Q1",
-                        "erc20": "0x8a9C6e5D8b0E2a1F3c4B6E7D8C9A0B1C2D3E4F5",
-                        "bnb": "bnb1q3e5r7t9y1u3i5o7p9l1k3j5h7g9f2d4s6q8w0"
-                    },
-                    "banner": {
-                        "text": "Special Offer: 15% discount with promo code WELCOME15",
-                        "visible": True,
-                        "link": "https://t.me/yourchannel",
-                        "link_text": "Join Channel"
-                    },
-                    "vip_catalogs": {
-                        "vip": {
-                            "name": "VIP Catalog",
-                            "price": 199,
-                            "redirect_url": "https://t.me/vip_channel",
-                            "visible": True,
-                            "preview_count": 3,
-                            "preview_profiles": [
-                                {"name": "Anna", "age": 23, "city": "Moscow", "photo": ""},
-                                {"name": "Sofia", "age": 21, "city": "Saint Petersburg", "photo": ""},
-                                {"name": "Maria", "age": 25, "city": "Kazan", "photo": ""}
-                            ]
-                        },
-                        "extra_vip": {
-                            "name": "Extra VIP",
-                            "price": 699,
-                            "redirect_url": "https://t.me/extra_vip_channel",
-                            "visible": True,
-                            "preview_count": 3,
-                            "preview_profiles": [
-                                {"name": "Elena", "age": 22, "city": "Novosibirsk", "photo": ""},
-                                {"name": "Victoria", "age": 24, "city": "Yekaterinburg", "photo": ""},
-                                {"name": "Daria", "age": 20, "city": "Krasnoyarsk", "photo": ""}
-                            ]
-                        },
-                        "secret": {
-                            "name": "Secret Catalog",
-                            "price": 2499,
-                            "redirect_url": "https://t.me/secret_channel",
-                            "visible": True,
-                            "preview_count": 3,
-                            "preview_profiles": [
-                                {"name": "Anastasia", "age": 26, "city": "Vladivostok", "photo": ""},
-                                {"name": "Polina", "age": 23, "city": "Rostov", "photo": ""},
-                                {"name": "Alina", "age": 21, "city": "Sochi", "photo": ""}
-                            ]
-                        }
-                    }
-                }
-            }
+        if stamp is None:
+            default_data = copy.deepcopy(_DEFAULT_DATA)
             _data_cache = default_data
-            _cache_timestamp = current_time_check
-            return default_data.copy()
+            mark_data_changed(profiles=True)
+            _cache_stamp = None
+            return default_data
         
         try:
-            with open(DATA_FILE, 'r', encoding='utf-8') as f:
-                loaded_data = json.load(f)
-                _cache_timestamp = current_time_check
+            with open(DATA_FILE, 'rb') as f:
+                loaded_data = orjson.loads(f.read())
+                _cache_stamp = stamp
                 
                 # Убедитесь что все секции существуют
-                if "settings" not in loaded_data:
-                    loaded_data["settings"] = {}
-                if "crypto_wallets" not in loaded_data.get("settings", {}):
-                    loaded_data["settings"]["crypto_wallets"] = {
-                        "trc20": "TY76gU8J9o8j7U6tY5r4E3W2Q1",
-                        "erc20": "0x8a9C6e5D8b0E2a1F3c4B6E7D8C9A0B1C2D3E4F5",
-                        "bnb": "bnb1q3e5r7t9y1u3i5o7p9l1k3j5h7g9f2d4s6q8w0"
-                    }
+                settings = loaded_data.setdefault("settings", {})
+                if "crypto_wallets" not in settings:
+                    settings["crypto_wallets"] = dict(_DEFAULT_SETTINGS["crypto_wallets"])
                 if "orders" not in loaded_data:
                     loaded_data["orders"] = []
                 if "chats" not in loaded_data:
@@ -388,7 +637,8 @@ def load_data():
                     loaded_data["vip_profiles"] = []
                     
                 _data_cache = loaded_data
-                return loaded_data.copy()
+                mark_data_changed(profiles=True)
+                return loaded_data
                 
         except Exception as e:
             logger.error(f"❌ Error loading data: {e}")
@@ -405,28 +655,63 @@ def load_data():
                 }
             }
             _data_cache = error_data
-            _cache_timestamp = current_time_check
-            return error_data.copy()
+            mark_data_changed(profiles=True)
+            _cache_stamp = _STAMP_INVALID
+            return error_data
+
+def _fsync_dir(path: str) -> None:
+    """fsync каталога, чтобы переименование пережило сбой питания (только POSIX)"""
+    if os.name != "posix":
+        return
+    fd = os.open(path or ".", os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def _data_file_mode() -> int:
+    """Права текущего data.json (0644 для нового файла)"""
+    try:
+        return os.stat(DATA_FILE).st_mode & 0o777
+    except FileNotFoundError:
+        return 0o644
+
 
 def save_data(data):
     """Save data with locking to prevent concurrent writes"""
     try:
         with _cache_lock:
-            # Записываем в файл атомарно (с временным файлом)
-            temp_file = DATA_FILE + '.tmp'
-            
-            with open(temp_file, 'w', encoding='utf-8') as f:
-                json.dump(data, f, ensure_ascii=False, indent=2)
-            
-            # Атомарный обмен файлов
-            if os.path.exists(DATA_FILE):
-                os.remove(DATA_FILE)
-            os.rename(temp_file, DATA_FILE)
+            payload = orjson.dumps(data, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
+
+            # Записываем в файл атомарно (с временным файлом): уникальное имя
+            # рядом с data.json, чтобы параллельные записи не делили один .tmp
+            data_dir = os.path.dirname(DATA_FILE)
+            fd, temp_file = tempfile.mkstemp(dir=data_dir or ".", prefix=".data-", suffix=".tmp")
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    # mkstemp создаёт файл с правами 0600 — сохраняем права data.json
+                    if hasattr(os, "fchmod"):
+                        os.fchmod(f.fileno(), _data_file_mode())
+                    f.write(payload)
+                    f.flush()
+                    os.fsync(f.fileno())
+
+                # Атомарный обмен файлов: os.replace — один вызов, старый файл
+                # не пропадает между удалением и переименованием
+                os.replace(temp_file, DATA_FILE)
+            except BaseException:
+                with contextlib.suppress(OSError):
+                    os.unlink(temp_file)
+                raise
+            _fsync_dir(data_dir)
             
             # Инвалидируем кэш
-            global _data_cache, _cache_timestamp
-            _data_cache = data.copy()
-            _cache_timestamp = time.time()
+            global _data_cache, _cache_stamp
+            if data is not _data_cache:
+                mark_data_changed(profiles=True)
+            _data_cache = data
+            _cache_stamp = _data_file_stamp()
             
             logger.debug("✅ Data saved successfully")
             return True
@@ -435,117 +720,203 @@ def save_data(data):
         logger.error(f"❌ Error saving data: {e}")
         return False
 
+async def load_data_async():
+    """
+    load_data() для async-обработчиков: свежий кэш отдаётся сразу,
+    чтение и разбор файла при промахе выполняются в потоке, не блокируя event loop
+    """
+    if _data_cache is not None and _data_file_stamp() == _cache_stamp:
+        return _data_cache
+    return await asyncio.to_thread(load_data)
+
+
+# Групповая запись: запросы на сохранение, пришедшие пока идёт запись,
+# объединяются в одну следующую запись того же dict
+_save_lock = asyncio.Lock()
+_save_requested = 0
+_save_completed = 0
+_save_last = (None, False)
+
+
+async def save_data_async(data):
+    """
+    save_data() для async-обработчиков: сериализация и запись файла в потоке
+
+    Если пока мы ждали очереди, запись этого же dict уже началась после нашего
+    запроса, она содержит и наши изменения — повторно файл не переписываем.
+    """
+    global _save_requested, _save_completed, _save_last
+    _save_requested += 1
+    ticket = _save_requested
+    async with _save_lock:
+        last_data, last_result = _save_last
+        if _save_completed >= ticket and last_data is data:
+            return last_result
+        target = _save_requested
+        result = await asyncio.to_thread(save_data, data)
+        _save_completed = target
+        _save_last = (data, result)
+        return result
+
+
+def cached_on_profiles_version(func):
+    """
+    Кэширует результат функции без аргументов до следующего изменения анкет.
+    Значение пересчитывается только при смене _profiles_version (загрузка файла),
+    поэтому сообщения, заказы и комментарии его не сбрасывают.
+    """
+    cached = {"version": None, "value": None}
+
+    @functools.wraps(func)
+    def wrapper():
+        load_data()  # обновляет _data_cache (и версии) при изменении файла
+        version = _profiles_version
+        if cached["version"] != version:
+            cached["value"] = func()
+            cached["version"] = version
+        return cached["value"]
+
+    return wrapper
+
+# Индексы по данным: строятся одним проходом на каждую версию данных и
+# заменяют линейные next(...)/списковые сканы в обработчиках на O(1)-поиск.
+# Индексы действительны только до ближайшего await: обработчик берёт их после
+# своих await. Добавив запись, он вызывает index_appended (индексы дополняются
+# на месте), а заменив список или удалив запись — mark_data_changed.
+_indexes_cache = {"data": None, "version": None, "value": None}
+
+
+def _index_chat(idx: dict, c: dict) -> None:
+    idx["chat_by_user_profile"].setdefault((c.get("telegram_user_id"), c["profile_id"]), c)
+    idx["chats_by_user"][c.get("telegram_user_id")].append(c)
+    if c.get("has_completed_transaction"):
+        idx["completed_transaction_chats"].add(c["id"])
+    if c["id"] > idx["max_ids"]["chats"]:
+        idx["max_ids"]["chats"] = c["id"]
+
+
+def _index_message(idx: dict, m: dict) -> None:
+    chat_id = m["chat_id"]
+    chat_messages = idx["messages_by_chat"][chat_id]
+    message_ids = idx["message_ids_by_chat"].get(chat_id)
+    if not chat_messages:
+        idx["message_ids_by_chat"][chat_id] = [m["id"]]
+    elif message_ids is not None:
+        # Старые данные admin.py (id = len+1) могут идти не по возрастанию:
+        # такой чат остаётся без индекса id и сканируется целиком
+        if m["id"] < message_ids[-1]:
+            del idx["message_ids_by_chat"][chat_id]
+        else:
+            message_ids.append(m["id"])
+    chat_messages.append(m)
+
+    if m["id"] > idx["max_ids"]["messages"]:
+        idx["max_ids"]["messages"] = m["id"]
+    max_message_id_by_chat = idx["max_message_id_by_chat"]
+    if m["id"] > max_message_id_by_chat.get(chat_id, m["id"] - 1):
+        max_message_id_by_chat[chat_id] = m["id"]
+    last = idx["last_message_by_chat"].get(chat_id)
+    if last is None or m.get("created_at", "") > last.get("created_at", ""):
+        idx["last_message_by_chat"][chat_id] = m
+    if not m.get("is_from_user", False) and not m.get("is_system", False):
+        # id обычно растут — insort дописывает в конец за O(log n)
+        bisect.insort(idx["incoming_ids_by_chat"][chat_id], m.get("id", 0))
+    elif (m.get("is_system") and chat_id not in idx["completed_transaction_chats"]
+          and "transaction successful" in m.get("text", "").lower()):
+        idx["completed_transaction_chats"].add(chat_id)
+
+
+def _index_comment(idx: dict, c: dict) -> None:
+    idx["comments_by_profile"][c["profile_id"]].append(c)
+    if c.get("id", 0) > idx["max_ids"]["comments"]:
+        idx["max_ids"]["comments"] = c["id"]
+
+
+def _index_order(idx: dict, o: dict) -> None:
+    idx["orders_by_user"][o.get("telegram_user_id")].append(o)
+    if o.get("id", 0) > idx["max_ids"]["orders"]:
+        idx["max_ids"]["orders"] = o["id"]
+
+
+_INDEXERS = {
+    "chats": _index_chat,
+    "messages": _index_message,
+    "comments": _index_comment,
+    "orders": _index_order,
+}
+
+
+def _build_data_indexes(data: dict) -> dict:
+    profiles_by_id = {}
+    for p in data.get("profiles", []):
+        profiles_by_id.setdefault(p["id"], p)
+
+    idx = {
+        "profiles_by_id": profiles_by_id,
+        "chat_by_user_profile": {},
+        "chats_by_user": collections.defaultdict(list),
+        "messages_by_chat": collections.defaultdict(list),
+        # Последнее сообщение чата по created_at (из равных — первое в списке)
+        "last_message_by_chat": {},
+        "max_message_id_by_chat": {},
+        # id сообщений от модели (не системных) — для подсчёта непрочитанных через bisect
+        "incoming_ids_by_chat": collections.defaultdict(list),
+        # id сообщений чата в порядке messages_by_chat — для bisect в get_chat_updates
+        "message_ids_by_chat": {},
+        # Чаты с завершённой транзакцией: флаг ставит admin.py при отправке
+        # системного сообщения, старые чаты добираются по сообщениям
+        "completed_transaction_chats": set(),
+        "comments_by_profile": collections.defaultdict(list),
+        "orders_by_user": collections.defaultdict(list),
+        "max_ids": {"chats": 0, "messages": 0, "comments": 0, "orders": 0},
+    }
+    # Чаты раньше сообщений: флаг has_completed_transaction проверяется до бэкфилла
+    for collection, indexer in _INDEXERS.items():
+        for item in data.get(collection, []):
+            indexer(idx, item)
+    return idx
+
+
+def get_data_indexes(data: dict) -> dict:
+    """Индексы для dict, полученного из load_data(); пересобираются при смене данных"""
+    if _indexes_cache["data"] is not data or _indexes_cache["version"] != _data_version:
+        _indexes_cache["value"] = _build_data_indexes(data)
+        _indexes_cache["data"] = data
+        _indexes_cache["version"] = _data_version
+    return _indexes_cache["value"]
+
+
+def index_appended(data: dict, collection: str, item: dict) -> None:
+    """
+    Дополняет индексы записью, только что добавленной в data[collection]
+    (chats/messages/comments/orders), без пересборки по всем данным.
+    Если индексы для data ещё не построены, следующий get_data_indexes
+    соберёт их с этой записью.
+    """
+    if _indexes_cache["data"] is data and _indexes_cache["version"] == _data_version:
+        _INDEXERS[collection](_indexes_cache["value"], item)
+
+
+def next_id(data: dict, collection: str) -> int:
+    """
+    Следующий id для chats/messages/comments/orders за O(1)
+
+    Общий с admin.py счётчик data["_seq"] (data_ids.next_id); максимальный id
+    берётся из индексов вместо прохода по коллекции.
+    """
+    return data_ids.next_id(data, collection, get_data_indexes(data)["max_ids"][collection])
+
+
 # Загрузка данных
 def load_data_legacy():
     if not os.path.exists(DATA_FILE):
-        return {
-            "profiles": [],
-            "vip_profiles": [],
-            "chats": [],
-            "messages": [],
-            "comments": [],
-            "promocodes": [],
-            "settings": {
-                "app": {
-                    "app_name": "Muji",
-                    "default_age": 25,
-                    "default_city": "Moscow",
-                    "vip_blurred_count": 3,
-                    "extra_vip_blurred_count": 3,
-                    "secret_blurred_count": 3
-                },
-                "crypto_wallets": {
-                    "trc20": "TY76gU8J9o8j7U6tY5r4E3W2Q1",
-                    "erc20": "0x8a9C6e5D8b0E2a1F3c4B6E7D8C9A0B1C2D3E4F5",
-                    "bnb": "bnb1q3e5r7t9y1u3i5o7p9l1k3j5h7g9f2d4s6q8w0"
-                },
-                "banner": {
-                    "text": "Special Offer: 15% discount with promo code WELCOME15",
-                    "visible": True,
-                    "link": "https://t.me/yourchannel",
-                    "link_text": "Join Channel"
-                },
-                "vip_catalogs": {
-                    "vip": {
-                        "name": "VIP Catalog",
-                        "price": 199,
-                        "redirect_url": "https://t.me/vip_channel",
-                        "visible": True,
-                        "preview_count": 3,
-                        "preview_profiles": [
-                            {"name": "Anna", "age": 23, "city": "Moscow", "photo": ""},
-                            {"name": "Sofia", "age": 21, "city": "Saint Petersburg", "photo": ""},
-                            {"name": "Maria", "age": 25, "city": "Kazan", "photo": ""}
-                        ]
-                    },
-                    "extra_vip": {
-                        "name": "Extra VIP",
-                        "price": 699,
-                        "redirect_url": "https://t.me/extra_vip_channel",
-                        "visible": True,
-                        "preview_count": 3,
-                        "preview_profiles": [
-                            {"name": "Elena", "age": 22, "city": "Novosibirsk", "photo": ""},
-                            {"name": "Victoria", "age": 24, "city": "Yekaterinburg", "photo": ""},
-                            {"name": "Daria", "age": 20, "city": "Krasnoyarsk", "photo": ""}
-                        ]
-                    },
-                    "secret": {
-                        "name": "Secret Catalog",
-                        "price": 2499,
-                        "redirect_url": "https://t.me/secret_channel",
-                        "visible": True,
-                        "preview_count": 3,
-                        "preview_profiles": [
-                            {"name": "Anastasia", "age": 26, "city": "Vladivostok", "photo": ""},
-                            {"name": "Polina", "age": 23, "city": "Rostov", "photo": ""},
-                            {"name": "Alina", "age": 21, "city": "Sochi", "photo": ""}
-                        ]
-                    }
-                }
-            }
-        }
+        return copy.deepcopy(_DEFAULT_DATA)
     try:
-        with open(DATA_FILE, 'r', encoding='utf-8') as f:
-            data = json.loads(f.read())
+        with open(DATA_FILE, 'rb') as f:
+            data = orjson.loads(f.read())
             # Ensure settings exist
             if "settings" not in data:
-                data["settings"] = {
-                    "crypto_wallets": {
-                        "trc20": "TY76gU8J9o8j7U6tY5r4E3W2Q1",
-                        "erc20": "0x8a9C6e5D8b0E2a1F3c4B6E7D8C9A0B1C2D3E4F5",
-                        "bnb": "bnb1q3e5r7t9y1u3i5o7p9l1k3j5h7g9f2d4s6q8w0"
-                    },
-                    "banner": {
-                        "text": "Special Offer: 15% discount with promo code WELCOME15",
-                        "visible": True,
-                        "link": "https://t.me/yourchannel",
-                        "link_text": "Join Channel"
-                    },
-                    "vip_catalogs": {
-                        "vip": {
-                            "name": "VIP Catalog",
-                            "price": 100,
-                            "redirect_url": "https://t.me/vip_channel",
-                            "visible": True,
-                            "preview_count": 3
-                        },
-                        "extra_vip": {
-                            "name": "Extra VIP",
-                            "price": 200,
-                            "redirect_url": "https://t.me/extra_vip_channel",
-                            "visible": True,
-                            "preview_count": 3
-                        },
-                        "secret": {
-                            "name": "Secret Catalog",
-                            "price": 300,
-                            "redirect_url": "https://t.me/secret_channel",
-                            "visible": True,
-                            "preview_count": 3
-                        }
-                    }
-                }
+                data["settings"] = copy.deepcopy(_DEFAULT_SETTINGS)
             if "promocodes" not in data:
                 data["promocodes"] = []
             if "comments" not in data:
@@ -555,84 +926,25 @@ def load_data_legacy():
             return data
     except Exception as e:
         print(f"Error loading data: {e}")
-        return {
-            "profiles": [],
-            "vip_profiles": [],
-            "chats": [],
-            "messages": [],
-            "comments": [],
-            "promocodes": [],
-            "settings": {
-                "app": {
-                    "app_name": "Muji",
-                    "default_age": 25,
-                    "default_city": "Moscow",
-                    "vip_blurred_count": 3,
-                    "extra_vip_blurred_count": 3,
-                    "secret_blurred_count": 3
-                },
-                "crypto_wallets": {
-                    "trc20": "TY76gU8J9o8j7U6tY5r4E3W2Q1",
-                    "erc20": "0x8a9C6e5D8b0E2a1F3c4B6E7D8C9A0B1C2D3E4F5",
-                    "bnb": "bnb1q3e5r7t9y1u3i5o7p9l1k3j5h7g9f2d4s6q8w0"
-                },
-                "banner": {
-                    "text": "Special Offer: 15% discount with promo code WELCOME15",
-                    "visible": True,
-                    "link": "https://t.me/yourchannel",
-                    "link_text": "Join Channel"
-                },
-                "vip_catalogs": {
-                    "vip": {
-                        "name": "VIP Catalog",
-                        "price": 199,
-                        "redirect_url": "https://t.me/vip_channel",
-                        "visible": True,
-                        "preview_count": 3,
-                        "preview_profiles": [
-                            {"name": "Anna", "age": 23, "city": "Moscow", "photo": ""},
-                            {"name": "Sofia", "age": 21, "city": "Saint Petersburg", "photo": ""},
-                            {"name": "Maria", "age": 25, "city": "Kazan", "photo": ""}
-                        ]
-                    },
-                    "extra_vip": {
-                        "name": "Extra VIP",
-                        "price": 699,
-                        "redirect_url": "https://t.me/extra_vip_channel",
-                        "visible": True,
-                        "preview_count": 3,
-                        "preview_profiles": [
-                            {"name": "Elena", "age": 22, "city": "Novosibirsk", "photo": ""},
-                            {"name": "Victoria", "age": 24, "city": "Yekaterinburg", "photo": ""},
-                            {"name": "Daria", "age": 20, "city": "Krasnoyarsk", "photo": ""}
-                        ]
-                    },
-                    "secret": {
-                        "name": "Secret Catalog",
-                        "price": 2499,
-                        "redirect_url": "https://t.me/secret_channel",
-                        "visible": True,
-                        "preview_count": 3,
-                        "preview_profiles": [
-                            {"name": "Anastasia", "age": 26, "city": "Vladivostok", "photo": ""},
-                            {"name": "Polina", "age": 23, "city": "Rostov", "photo": ""},
-                            {"name": "Alina", "age": 21, "city": "Sochi", "photo": ""}
-                        ]
-                    }
-                }
-            }
-        }
+        return copy.deepcopy(_DEFAULT_DATA)
 
 # Сохранение файла
-def save_uploaded_file(file: UploadFile) -> str:
-    """Сохраняет загруженный файл и возвращает путь к нему"""
+UPLOAD_COPY_BUFFER = 1024 * 1024  # 1 MiB вместо 16 KiB по умолчанию у copyfileobj
+
+
+def _copy_upload(src, file_path: str) -> None:
+    with open(file_path, "wb") as buffer:
+        shutil.copyfileobj(src, buffer, length=UPLOAD_COPY_BUFFER)
+
+
+async def save_uploaded_file(file: UploadFile) -> str:
+    """Сохраняет загруженный файл и возвращает путь к нему (копирование в потоке)"""
     try:
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
-        filename = f"{timestamp}_{file.filename}"
+        # Случайный префикс вместо метки времени: без коллизий и без strftime
+        filename = f"{secrets.token_urlsafe(8)}_{file.filename}"
         file_path = os.path.join(UPLOAD_DIR, filename)
 
-        with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
+        await asyncio.to_thread(_copy_upload, file.file, file_path)
 
         return f"/uploads/{filename}"
     except Exception as e:
@@ -640,14 +952,16 @@ def save_uploaded_file(file: UploadFile) -> str:
         return ""
 
 # Определяем тип файла по расширению
+_IMAGE_EXTENSIONS = frozenset({'jpg', 'jpeg', 'png', 'gif', 'bmp', 'webp'})
+_VIDEO_EXTENSIONS = frozenset({'mp4', 'avi', 'mov', 'mkv', 'webm'})
+
+
 def get_file_type(filename: str) -> str:
-    extension = filename.lower().split('.')[-1]
-    image_extensions = ['jpg', 'jpeg', 'png', 'gif', 'bmp', 'webp']
-    video_extensions = ['mp4', 'avi', 'mov', 'mkv', 'webm']
+    extension = filename.rpartition('.')[2].lower()
 
-    if extension in image_extensions:
+    if extension in _IMAGE_EXTENSIONS:
         return 'image'
-    elif extension in video_extensions:
+    elif extension in _VIDEO_EXTENSIONS:
         return 'video'
     else:
         return 'file'
@@ -722,21 +1036,37 @@ async def send_telegram_notification_async(user_info: dict, profile_info: dict,
         logger.error(f"❌ Error sending Telegram notification: {e}")
 
 # API endpoints
+def _file_etag(path: str) -> str:
+    """Слабый ETag по времени изменения и размеру файла"""
+    st = os.stat(path)
+    return f'W/"{int(st.st_mtime)}-{st.st_size}"'
+
+
+def _cached_file_response(request: Request, path: str, cache_control: str) -> Response:
+    """FileResponse с ETag: при совпадении If-None-Match отдаём 304 без тела"""
+    etag = _file_etag(path)
+    headers = {"Cache-Control": cache_control, "ETag": etag}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    return FileResponse(path, headers=headers)
+
+
 @app.get("/")
-async def main():
+async def main(request: Request):
     # Возвращаем index.html если есть, иначе простой JSON для проверки работы бекенда.
     index_path = os.path.join(frontend_dir, "index.html")
     if os.path.exists(index_path):
-        return FileResponse(index_path)
+        # no-cache: браузер всегда перепроверяет ETag, новый деплой виден сразу
+        return _cached_file_response(request, index_path, "no-cache")
     logger.info("ℹ️ Frontend index.html not found, returning status JSON")
     return {"status": "ok", "message": "Muji backend is running", "frontend_found": False}
 
 @app.get("/manifest.json")
-async def get_manifest():
+async def get_manifest(request: Request):
     """Serve PWA manifest file"""
     manifest_path = os.path.join(frontend_dir, "manifest.json")
     if os.path.exists(manifest_path):
-        return FileResponse(manifest_path)
+        return _cached_file_response(request, manifest_path, "public, max-age=3600")
     # Если манифеста нет — вернуть 404 с коротким сообщением (меньше падений в логах nginx/ngrok)
     raise HTTPException(status_code=404, detail="manifest.json not found")
 
@@ -756,15 +1086,17 @@ async def telegram_auth(request: Request, response: Response):
         if not init_data:
             raise HTTPException(status_code=400, detail="Missing initData")
 
+        # Parse once, reuse for verification and user data
+        pairs = parse_qsl(init_data, keep_blank_values=True)
+
         # SECURITY: Verify Telegram data authenticity
-        if not verify_telegram_auth(init_data):
+        if not verify_telegram_auth(init_data, pairs=pairs):
             logger.warning("⚠️ Invalid Telegram authentication attempt")
             raise HTTPException(status_code=401, detail="Invalid Telegram authentication")
 
         # Parse user data from Telegram
-        parsed_data = parse_qs(init_data)
-        user_json = parsed_data.get('user', ['{}'])[0]
-        user_data = json.loads(user_json) if user_json != '{}' else {}
+        user_json = next((v for k, v in pairs if k == 'user'), '{}')
+        user_data = orjson.loads(user_json) if user_json != '{}' else {}
 
         telegram_id = user_data.get('id')
         if not telegram_id:
@@ -813,6 +1145,7 @@ async def telegram_auth(request: Request, response: Response):
             }
         }
     except json.JSONDecodeError:
+        # orjson.JSONDecodeError — подкласс json.JSONDecodeError (тело запроса и user)
         raise HTTPException(status_code=400, detail="Invalid JSON data")
     except HTTPException:
         raise
@@ -860,6 +1193,76 @@ async def telegram_logout(request: Request, response: Response):
 
 # ============= END TELEGRAM AUTHENTICATION ENDPOINTS =============
 
+# Столбцовое представление видимых анкет для get_profiles: значения полей
+# вынесены в плоские списки один раз на версию данных, фильтры сужают список
+# индексов вместо повторных проходов по dict-ам
+# (поле, значение по умолчанию для *_min, значение по умолчанию для *_max)
+_PROFILE_RANGE_FIELDS = (("age", 0, 100), ("height", 0, 250), ("weight", 0, 200), ("chest", 0, 12))
+
+
+@cached_on_profiles_version
+def _profile_columns():
+    data = load_data()
+    rows = [p for p in data["profiles"] if p.get("visible", True)]
+    cols = {
+        "rows": rows,
+        # Строковые поля сразу в нижнем регистре — lower() не вызывается на каждый запрос
+        "city_lc": [p.get("city", "").lower() for p in rows],
+        "nationality_lc": [p.get("nationality", "").lower() for p in rows],
+        "gender_lc": [p.get("gender", "").lower() for p in rows],
+        "travel_cities_lc": [frozenset(c.lower() for c in p.get("travel_cities", [])) for p in rows],
+    }
+    for field, min_default, max_default in _PROFILE_RANGE_FIELDS:
+        cols[f"{field}_min"] = [p.get(field, min_default) for p in rows]
+        cols[f"{field}_max"] = [p.get(field, max_default) for p in rows]
+    return cols
+
+
+# Результаты фильтрации анкет: (версия данных, фильтры) -> индексы строк
+PROFILE_QUERY_CACHE_MAXSIZE = 256
+_profile_query_cache = _TTLCache(maxsize=PROFILE_QUERY_CACHE_MAXSIZE, ttl=300)
+
+
+def _select_profiles(cols, city_lower, nationality_lower, travel_lower, ranges, gender_lower):
+    """Индексы анкет, прошедших фильтры (текстовые значения уже в нижнем регистре)"""
+    # Каждый активный фильтр — один проход по уже суженному списку индексов.
+    # Это и есть «слияние» проходов: словари анкет не читаются, а следующий фильтр
+    # видит только выжившие строки. Вариант «один проход + all(predicate(i) ...)»
+    # в CPython медленнее на порядок из-за вызова функции на каждую проверку.
+    selected = range(len(cols["rows"]))
+
+    # Фильтрация по городу
+    if city_lower:
+        col = cols["city_lc"]
+        selected = [i for i in selected if col[i] == city_lower]
+
+    # Фильтрация по национальности
+    if nationality_lower:
+        col = cols["nationality_lc"]
+        selected = [i for i in selected if col[i] == nationality_lower]
+
+    # Фильтрация по городу вылета
+    if travel_lower:
+        col = cols["travel_cities_lc"]
+        selected = [i for i in selected if travel_lower in col[i]]
+
+    # Фильтрация по возрасту, росту, весу и груди
+    for field, low, high in ranges:
+        if low:
+            col = cols[f"{field}_min"]
+            selected = [i for i in selected if col[i] >= low]
+        if high:
+            col = cols[f"{field}_max"]
+            selected = [i for i in selected if col[i] <= high]
+
+    # Фильтрация по полу
+    if gender_lower:
+        col = cols["gender_lc"]
+        selected = [i for i in selected if col[i] == gender_lower]
+
+    return tuple(selected)
+
+
 @app.get("/api/profiles")
 async def get_profiles(
     page: int = 0,
@@ -877,101 +1280,91 @@ async def get_profiles(
     chest_max: int = None,
     gender: str = None
 ):
-    data = load_data()
-    profiles = [p for p in data["profiles"] if p.get("visible", True)]
-
-    # Фильтрация по городу
-    if city and city != "all":
-        profiles = [p for p in profiles if p.get("city", "").lower() == city.lower()]
+    await load_data_async()  # прогреваем кэш вне event loop
+    cols = _profile_columns()
 
-    # Фильтрация по национальности
-    if nationality and nationality != "all":
-        profiles = [p for p in profiles if p.get("nationality", "").lower() == nationality.lower()]
-
-    # Фильтрация по городу вылета
-    if travel_city and travel_city != "all":
-        profiles = [p for p in profiles if travel_city.lower() in [c.lower() for c in p.get("travel_cities", [])]]
-
-    # Фильтрация по возрасту
-    if age_min:
-        profiles = [p for p in profiles if p.get("age", 0) >= age_min]
-    if age_max:
-        profiles = [p for p in profiles if p.get("age", 100) <= age_max]
-
-    # Фильтрация по росту
-    if height_min:
-        profiles = [p for p in profiles if p.get("height", 0) >= height_min]
-    if height_max:
-        profiles = [p for p in profiles if p.get("height", 250) <= height_max]
-
-    # Фильтрация по весу
-    if weight_min:
-        profiles = [p for p in profiles if p.get("weight", 0) >= weight_min]
-    if weight_max:
-        profiles = [p for p in profiles if p.get("weight", 200) <= weight_max]
-
-    # Фильтрация по груди
-    if chest_min:
-        profiles = [p for p in profiles if p.get("chest", 0) >= chest_min]
-    if chest_max:
-        profiles = [p for p in profiles if p.get("chest", 12) <= chest_max]
+    def text_filter(value):
+        return value.lower() if value and value != "all" else None
 
-    # Фильтрация по полу
-    if gender and gender != "all":
-        profiles = [p for p in profiles if p.get("gender", "").lower() == gender.lower()]
+    filters = (
+        text_filter(city), text_filter(nationality), text_filter(travel_city),
+        (("age", age_min or None, age_max or None), ("height", height_min or None, height_max or None),
+         ("weight", weight_min or None, weight_max or None), ("chest", chest_min or None, chest_max or None)),
+        text_filter(gender),
+    )
+    # total обязан быть точным, поэтому ранний выход по странице невозможен;
+    # вместо этого отфильтрованный список кэшируется, и листание страниц
+    # с теми же фильтрами не фильтрует анкеты заново
+    cache_key = (_profiles_version, filters)
+    selected = _profile_query_cache.get(cache_key)
+    if selected is None:
+        selected = _select_profiles(cols, *filters)
+        _profile_query_cache.put(cache_key, selected)
 
     # Пагинация
     start = page * limit
     end = start + limit
-    paginated_profiles = profiles[start:end]
+    rows = cols["rows"]
+    paginated_profiles = [rows[i] for i in selected[start:end]]
 
-    return {
+    return ORJSONResponse({
         "profiles": paginated_profiles,
-        "has_more": end < len(profiles),
-        "total": len(profiles)
-    }
+        "has_more": end < len(selected),
+        "total": len(selected)
+    })
 
 @app.get("/api/vip-profiles")
 async def get_vip_profiles():
     """Получить VIP анкеты для каталогов"""
-    data = load_data()
+    data = await load_data_async()
     vip_profiles = data.get("vip_profiles", [])
 
-    # Перемешиваем для рандомного отображения
-    import random
-    random.shuffle(vip_profiles)
-
-    return {"profiles": vip_profiles}
+    # Перемешиваем для рандомного отображения (копией — список в кэше не трогаем)
+    return {"profiles": random.sample(vip_profiles, len(vip_profiles))}
 
 @app.get("/api/vip-catalogs")
 async def get_vip_catalogs():
     """Получить настройки VIP каталогов"""
-    data = load_data()
+    data = await load_data_async()
     return data.get("settings", {}).get("vip_catalogs", {})
 
+@cached_on_profiles_version
+def _filter_values():
+    """
+    Уникальные значения для фильтров — один проход по анкетам на версию данных.
+    Кортежи неизменяемы, поэтому один и тот же ответ безопасно отдавать всем запросам.
+    """
+    profiles = load_data()["profiles"]
+    # Генераторы множеств и chain.from_iterable держат цикл в C,
+    # без вызова set.add/set.update на каждую анкету
+    cities = {p["city"] for p in profiles if p.get("city")}
+    nationalities = {p["nationality"] for p in profiles if p.get("nationality")}
+    travel_cities = set(itertools.chain.from_iterable(
+        p["travel_cities"] for p in profiles if "travel_cities" in p
+    ))
+    return {
+        "cities": {"cities": tuple(sorted(cities))},
+        "nationalities": {"nationalities": tuple(sorted(nationalities))},
+        "travel_cities": {"travel_cities": tuple(sorted(travel_cities))},
+    }
+
 @app.get("/api/filters/cities")
 async def get_cities():
     """Получить список всех городов для фильтра"""
-    data = load_data()
-    cities = list(set([p.get("city", "") for p in data["profiles"] if p.get("city")]))
-    return {"cities": sorted(cities)}
+    await load_data_async()
+    return _filter_values()["cities"]
 
 @app.get("/api/filters/nationalities")
 async def get_nationalities():
     """Получить список всех национальностей для фильтра"""
-    data = load_data()
-    nationalities = list(set([p.get("nationality", "") for p in data["profiles"] if p.get("nationality")]))
-    return {"nationalities": sorted(nationalities)}
+    await load_data_async()
+    return _filter_values()["nationalities"]
 
 @app.get("/api/filters/travel_cities")
 async def get_travel_cities():
     """Получить список всех городов вылета"""
-    data = load_data()
-    travel_cities = set()
-    for profile in data["profiles"]:
-        if "travel_cities" in profile:
-            travel_cities.update(profile["travel_cities"])
-    return {"travel_cities": sorted(list(travel_cities))}
+    await load_data_async()
+    return _filter_values()["travel_cities"]
 
 @app.get("/api/filters/genders")
 async def get_genders():
@@ -980,16 +1373,15 @@ async def get_genders():
 
 @app.get("/api/profiles/{profile_id}")
 async def get_profile(profile_id: int):
-    data = load_data()
-    profile = next((p for p in data["profiles"] if p["id"] == profile_id), None)
+    data = await load_data_async()
+    idx = get_data_indexes(data)
+    profile = idx["profiles_by_id"].get(profile_id)
     if not profile:
         raise HTTPException(status_code=404, detail="Profile not found")
 
-    # Загружаем комментарии для этого профиля
-    comments = [c for c in data.get("comments", []) if c["profile_id"] == profile_id]
-    profile["comments"] = comments
-
-    return profile
+    # Загружаем комментарии для этого профиля (в ответ, не в закэшированный профиль)
+    comments = list(idx["comments_by_profile"].get(profile_id, ()))
+    return {**profile, "comments": comments}
 
 @app.post("/api/chats/{profile_id}/messages")
 async def send_message(
@@ -1002,15 +1394,12 @@ async def send_message(
 
     USER ISOLATION: Требуется авторизация. Сообщения привязаны к telegram_user_id.
     Парсим Form/multipart данные вручную для избежания 422 ошибок.
+    Starlette сам складывает файлы больше 1 MiB во временный файл на диске,
+    save_uploaded_file копирует его блоками в потоке; после ответа форма
+    закрывается, чтобы временный файл удалялся сразу, а не сборщиком мусора.
     """
+    form_data = None
     try:
-        data = load_data()
-
-        # Находим профиль для имени
-        profile = next((p for p in data["profiles"] if p["id"] == profile_id), None)
-        if not profile:
-            raise HTTPException(status_code=404, detail="Profile not found")
-
         # USER ISOLATION: Получаем telegram_user_id только из cookie
         actual_telegram_user_id = user.get("telegram_id")
 
@@ -1027,35 +1416,48 @@ async def send_message(
         if not text and not file:
             raise HTTPException(status_code=400, detail="Text or file is required")
 
+        # Данные и индексы — после await request.form(): иначе два параллельных
+        # первых сообщения видят старый индекс и создают два чата
+        data = await load_data_async()
+        idx = get_data_indexes(data)
+
+        # Находим профиль для имени
+        profile = idx["profiles_by_id"].get(profile_id)
+        if not profile:
+            raise HTTPException(status_code=404, detail="Profile not found")
+
+        # Одна метка времени на запрос для чата и сообщения
+        now_iso = datetime.now().isoformat()
+
         # Находим или создаем чат для этого пользователя
-        chat = next((c for c in data["chats"]
-                    if c["profile_id"] == profile_id
-                    and c.get("telegram_user_id") == actual_telegram_user_id), None)
+        chat = idx["chat_by_user_profile"].get((actual_telegram_user_id, profile_id))
 
         if not chat:
             chat = {
-                "id": len(data["chats"]) + 1,
+                "id": next_id(data, "chats"),
                 "profile_id": profile_id,
                 "profile_name": profile["name"],
-                "created_at": datetime.now().isoformat(),
+                "created_at": now_iso,
                 "telegram_user_id": actual_telegram_user_id,
                 "user_username": user.get("username", ""),
                 "user_first_name": user.get("first_name", ""),
                 "user_last_name": user.get("last_name", "")
             }
             data["chats"].append(chat)
+            # Впереди await save_uploaded_file — индексы должны увидеть новый чат сразу
+            index_appended(data, "chats", chat)
 
         # Подготавливаем данные сообщения
         message_data = {
-            "id": len(data["messages"]) + 1,
+            "id": next_id(data, "messages"),
             "chat_id": chat["id"],
             "is_from_user": True,
-            "created_at": datetime.now().isoformat()
+            "created_at": now_iso
         }
 
         # Если есть файл
         if file and hasattr(file, 'filename') and file.filename:
-            file_url = save_uploaded_file(file)
+            file_url = await save_uploaded_file(file)
             file_type = get_file_type(file.filename)
 
             message_data.update({
@@ -1069,11 +1471,12 @@ async def send_message(
             message_data["text"] = text
 
         data["messages"].append(message_data)
-        save_data(data)
+        index_appended(data, "messages", message_data)
+        await save_data_async(data)
         logger.info(f"✅ Message sent: chat_id={chat['id']}, user_id={actual_telegram_user_id}, has_file={bool(file and hasattr(file, 'filename'))}")
 
         # Отправляем уведомление в Telegram асинхронно (в фоне, не блокируя ответ)
-        asyncio.create_task(
+        spawn_background(
             send_telegram_notification_async(
                 user_info={
                     "username": user.get("username", ""),
@@ -1098,6 +1501,9 @@ async def send_message(
     except Exception as e:
         logger.error(f"❌ Error sending message: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail=f"Message send error: {str(e)}")
+    finally:
+        if form_data is not None:
+            await form_data.close()
 
 @app.get("/api/chats/{profile_id}/messages")
 async def get_chat_messages(profile_id: int, user: dict = Depends(get_telegram_user)):
@@ -1107,18 +1513,18 @@ async def get_chat_messages(profile_id: int, user: dict = Depends(get_telegram_u
     ⚠️ ВАЖНО: Не передавайте telegram_user_id в URL параметрах!
     """
     try:
-        data = load_data()
+        data = await load_data_async()
         telegram_user_id = user.get("telegram_id")
 
+        idx = get_data_indexes(data)
+
         # USER ISOLATION: Ищем чат этого пользователя с профилем
-        chat = next((c for c in data["chats"]
-                    if c["profile_id"] == profile_id
-                    and c.get("telegram_user_id") == telegram_user_id), None)
+        chat = idx["chat_by_user_profile"].get((telegram_user_id, profile_id))
 
         if not chat:
             return {"messages": []}
 
-        messages = [m for m in data["messages"] if m["chat_id"] == chat["id"]]
+        messages = list(idx["messages_by_chat"].get(chat["id"], ()))
         logger.debug(f"✅ Retrieved {len(messages)} messages for chat {profile_id}")
         return {"messages": messages}
     
@@ -1135,19 +1541,25 @@ async def get_chat_updates(profile_id: int, last_message_id: int = 0, user: dict
     ⚠️ ВАЖНО: Не передавайте telegram_user_id в URL параметрах!
     """
     try:
-        data = load_data()
+        data = await load_data_async()
         telegram_user_id = user.get("telegram_id")
 
+        idx = get_data_indexes(data)
+
         # USER ISOLATION: Ищем чат этого пользователя с профилем
-        chat = next((c for c in data["chats"]
-                    if c["profile_id"] == profile_id
-                    and c.get("telegram_user_id") == telegram_user_id), None)
+        chat = idx["chat_by_user_profile"].get((telegram_user_id, profile_id))
 
         if not chat:
             return {"messages": [], "last_message_id": 0}
 
-        messages = [m for m in data["messages"] if m["chat_id"] == chat["id"] and m["id"] > last_message_id]
-        max_id = max([m["id"] for m in data["messages"]]) if data["messages"] else 0
+        chat_messages = idx["messages_by_chat"].get(chat["id"], ())
+        message_ids = idx["message_ids_by_chat"].get(chat["id"])
+        if message_ids is not None:
+            # id упорядочены — новые сообщения это хвост списка после bisect
+            messages = chat_messages[bisect.bisect_right(message_ids, last_message_id):]
+        else:
+            messages = [m for m in chat_messages if m["id"] > last_message_id]
+        max_id = idx["max_ids"]["messages"]
 
         return {"messages": messages, "last_message_id": max_id}
     
@@ -1164,28 +1576,29 @@ async def get_user_chats(user: dict = Depends(get_telegram_user)):
     ⚠️ ВАЖНО: Не передавайте telegram_user_id в URL параметрах!
     """
     try:
-        data = load_data()
+        data = await load_data_async()
         telegram_user_id = user.get("telegram_id")
 
-        # USER ISOLATION: Фильтруем чаты по telegram_user_id
-        chats = [c for c in data.get("chats", []) if c.get("telegram_user_id") == telegram_user_id]
+        idx = get_data_indexes(data)
+
+        # USER ISOLATION: Берём только чаты этого telegram_user_id
+        chats = idx["chats_by_user"].get(telegram_user_id, ())
 
         chat_list = []
         for chat in chats:
             # Получаем профиль
-            profile = next((p for p in data["profiles"] if p["id"] == chat["profile_id"]), None)
+            profile = idx["profiles_by_id"].get(chat["profile_id"])
             if not profile:
                 continue
 
             # Получаем последнее сообщение
-            chat_messages = [m for m in data["messages"] if m["chat_id"] == chat["id"]]
+            chat_messages = idx["messages_by_chat"].get(chat["id"], ())
             last_message = None
             last_message_time = None
 
             if chat_messages:
-                # Сортируем по времени создания или id
-                chat_messages.sort(key=lambda x: x.get("created_at", ""), reverse=True)
-                last_msg = chat_messages[0]
+                # Последнее сообщение посчитано при построении индексов — O(1) на чат
+                last_msg = idx["last_message_by_chat"][chat["id"]]
 
                 # Формируем текст последнего сообщения
                 if last_msg.get("file_url"):
@@ -1203,12 +1616,11 @@ async def get_user_chats(user: dict = Depends(get_telegram_user)):
                 last_message = "No messages yet"
                 last_message_time = chat.get("created_at")
 
-            # Считаем непрочитанные сообщения (от модели, после последнего прочитанного)
+            # Считаем непрочитанные сообщения (от модели, после последнего прочитанного):
+            # id входящих отсортированы при построении индексов, поэтому хватает bisect
             last_read_id = chat.get("last_read_message_id", 0)
-            unread_count = len([m for m in chat_messages
-                               if not m.get("is_from_user", False)
-                               and not m.get("is_system", False)
-                               and m.get("id", 0) > last_read_id])
+            incoming_ids = idx["incoming_ids_by_chat"].get(chat["id"], ())
+            unread_count = len(incoming_ids) - bisect.bisect_right(incoming_ids, last_read_id)
 
             chat_item = {
                 "chat_id": chat["id"],
@@ -1223,9 +1635,9 @@ async def get_user_chats(user: dict = Depends(get_telegram_user)):
             chat_list.append(chat_item)
 
         # Сортируем по времени последнего сообщения
-        chat_list.sort(key=lambda x: x.get("last_message_time", ""), reverse=True)
+        chat_list.sort(key=operator.itemgetter("last_message_time"), reverse=True)
 
-        return {"chats": chat_list}
+        return ORJSONResponse({"chats": chat_list})
     
     except Exception as e:
         logger.error(f"❌ Error retrieving user chats: {e}", exc_info=True)
@@ -1240,23 +1652,22 @@ async def mark_chat_read(profile_id: int, user: dict = Depends(get_telegram_user
     ⚠️ ВАЖНО: Не передавайте telegram_user_id в URL параметрах!
     """
     try:
-        data = load_data()
+        data = await load_data_async()
         telegram_user_id = user.get("telegram_id")
 
+        idx = get_data_indexes(data)
+
         # USER ISOLATION: Ищем чат этого пользователя
-        chat = next((c for c in data["chats"]
-                    if c["profile_id"] == profile_id
-                    and c.get("telegram_user_id") == telegram_user_id), None)
+        chat = idx["chat_by_user_profile"].get((telegram_user_id, profile_id))
 
         if not chat:
             return {"status": "chat_not_found"}
 
-        # Находим максимальный ID сообщения в чате
-        chat_messages = [m for m in data["messages"] if m["chat_id"] == chat["id"]]
-        if chat_messages:
-            max_message_id = max(m["id"] for m in chat_messages)
+        # Максимальный ID сообщения в чате посчитан при построении индексов
+        max_message_id = idx["max_message_id_by_chat"].get(chat["id"])
+        if max_message_id is not None:
             chat["last_read_message_id"] = max_message_id
-            save_data(data)
+            await save_data_async(data)
 
         return {"status": "marked_read"}
     
@@ -1268,8 +1679,8 @@ async def mark_chat_read(profile_id: int, user: dict = Depends(get_telegram_user
 # Комментарии к профилям
 @app.get("/api/profiles/{profile_id}/comments")
 async def get_profile_comments(profile_id: int):
-    data = load_data()
-    comments = [c for c in data.get("comments", []) if c["profile_id"] == profile_id]
+    data = await load_data_async()
+    comments = list(get_data_indexes(data)["comments_by_profile"].get(profile_id, ()))
     return {"comments": comments}
 
 @app.post("/api/profiles/{profile_id}/comments")
@@ -1280,19 +1691,18 @@ async def add_profile_comment(profile_id: int, comment_data: dict, user: dict =
     USER ISOLATION: Пользователь может оставить комментарий только если завершил транзакцию
     в своем собственном чате с этим профилем
     """
-    data = load_data()
+    data = await load_data_async()
 
     telegram_user_id = user.get("telegram_id")
+    idx = get_data_indexes(data)
 
     # Проверяем существование профиля
-    profile = next((p for p in data["profiles"] if p["id"] == profile_id), None)
+    profile = idx["profiles_by_id"].get(profile_id)
     if not profile:
         raise HTTPException(status_code=404, detail="Profile not found")
 
     # USER ISOLATION: Проверяем, есть ли у ЭТОГО пользователя чат с профилем
-    chat = next((c for c in data["chats"]
-                if c["profile_id"] == profile_id
-                and c.get("telegram_user_id") == telegram_user_id), None)
+    chat = idx["chat_by_user_profile"].get((telegram_user_id, profile_id))
 
     if not chat:
         raise HTTPException(
@@ -1301,10 +1711,9 @@ async def add_profile_comment(profile_id: int, comment_data: dict, user: dict =
         )
 
     # Проверяем, завершил ли пользователь транзакцию в СВОЕМ чате
-    messages = [m for m in data["messages"] if m["chat_id"] == chat["id"]]
-    has_transaction_completed = any(
-        m.get("is_system") and "transaction successful" in m.get("text", "").lower()
-        for m in messages
+    has_transaction_completed = (
+        chat.get("has_completed_transaction")
+        or chat["id"] in idx["completed_transaction_chats"]
     )
 
     if not has_transaction_completed:
@@ -1327,7 +1736,7 @@ async def add_profile_comment(profile_id: int, comment_data: dict, user: dict =
         promo_code = user_orders[-1].get("promo_code", None)
 
     new_comment = {
-        "id": len(data.get("comments", [])) + 1,
+        "id": next_id(data, "comments"),
         "profile_id": profile_id,
         "user_name": username,
         "telegram_username": user.get("username", ""),
@@ -1340,7 +1749,8 @@ async def add_profile_comment(profile_id: int, comment_data: dict, user: dict =
     if "comments" not in data:
         data["comments"] = []
     data["comments"].append(new_comment)
-    save_data(data)
+    index_appended(data, "comments", new_comment)
+    await save_data_async(data)
 
     logger.info(f"✅ Comment added by user {telegram_user_id} to profile {profile_id}")
     return {"status": "added", "comment": new_comment}
@@ -1348,19 +1758,19 @@ async def add_profile_comment(profile_id: int, comment_data: dict, user: dict =
 @app.get("/api/settings/crypto_wallets")
 async def get_crypto_wallets():
     """Получить настройки крипто-кошельков"""
-    data = load_data()
+    data = await load_data_async()
     return data.get("settings", {}).get("crypto_wallets", {})
 
 @app.get("/api/settings/banner")
 async def get_banner():
     """Получить настройки баннера"""
-    data = load_data()
+    data = await load_data_async()
     return data.get("settings", {}).get("banner", {})
 
 @app.get("/api/settings/app")
 async def get_app_settings():
     """Получить настройки приложения"""
-    data = load_data()
+    data = await load_data_async()
     default_settings = {
         "app_name": "Muji",
         "default_age": 25,
@@ -1375,13 +1785,13 @@ async def get_app_settings():
 @app.get("/api/promocodes")
 async def get_promocodes():
     """Получить все промокоды"""
-    data = load_data()
+    data = await load_data_async()
     return {"promocodes": data.get("promocodes", [])}
 
 @app.post("/api/promocodes/validate")
 async def validate_promocode(validation: dict, request: Request, user: Optional[dict] = Depends(get_telegram_user_optional)):
     """Проверить промокод"""
-    data = load_data()
+    data = await load_data_async()
     code = validation["code"].upper()
 
     # Debug with print (will always show in console)
@@ -1425,7 +1835,7 @@ async def validate_promocode(validation: dict, request: Request, user: Optional[
                 "used_at": datetime.now().isoformat()
             }
             promocode["used_by"].append(usage_info)
-            save_data(data)
+            await save_data_async(data)
             print(f"✅ SUCCESS: Saved user {telegram_user_id} (@{user.get('username', 'N/A')})")
             logger.info(f"✅ Promocode {code} used by user {telegram_user_id} (@{user.get('username', 'N/A')})")
         else:
@@ -1442,6 +1852,10 @@ async def validate_promocode(validation: dict, request: Request, user: Optional[
     }
 
 # Система оплаты
+# Время на оплату заказа, после которого cleanup_expired_orders_once удаляет unpaid заказ
+ORDER_PAYMENT_WINDOW = timedelta(hours=1)
+
+
 @app.post("/api/payment/crypto")
 async def process_crypto_payment(payment_data: dict, user: dict = Depends(get_telegram_user)):
     """
@@ -1449,7 +1863,7 @@ async def process_crypto_payment(payment_data: dict, user: dict = Depends(get_te
 
     USER ISOLATION: Требуется авторизация. Заказы привязаны к telegram_user_id.
     """
-    data = load_data()
+    data = await load_data_async()
 
     profile_id = payment_data["profile_id"]
     amount = float(payment_data["amount"])
@@ -1470,11 +1884,13 @@ async def process_crypto_payment(payment_data: dict, user: dict = Depends(get_te
     if "orders" not in data:
         data["orders"] = []
 
+    now = datetime.now()
+    expires_at = (now + ORDER_PAYMENT_WINDOW).isoformat()
+
     # USER ISOLATION: Ищем существующий unpaid order для этого пользователя и профиля
-    existing_order = next((o for o in data["orders"]
+    existing_order = next((o for o in get_data_indexes(data)["orders_by_user"].get(telegram_user_id, ())
                           if o.get("profile_id") == profile_id
-                          and o.get("status") == "unpaid"
-                          and o.get("telegram_user_id") == telegram_user_id), None)
+                          and o.get("status") == "unpaid"), None)
 
     if existing_order:
         # Обновляем существующий order
@@ -1483,15 +1899,14 @@ async def process_crypto_payment(payment_data: dict, user: dict = Depends(get_te
         existing_order["total_amount"] = total_amount
         existing_order["crypto_type"] = wallet_type
         existing_order["currency"] = currency
-        existing_order["expires_at"] = (datetime.now() + timedelta(hours=1)).isoformat()
+        existing_order["expires_at"] = expires_at
         order = existing_order
         logger.info(f"💰 Updated existing order #{order['id']}: ${amount} + {bonus_percentage}% bonus = ${total_amount}")
     else:
         # Создаем новый order с числовым ID и 18-значным order_number
-        max_id = max([o.get("id", 0) for o in data["orders"]], default=0)
         order_number = generate_order_code()
         order = {
-            "id": max_id + 1,
+            "id": next_id(data, "orders"),
             "order_number": order_number,
             "profile_id": profile_id,
             "amount": amount,
@@ -1500,14 +1915,15 @@ async def process_crypto_payment(payment_data: dict, user: dict = Depends(get_te
             "crypto_type": wallet_type,
             "currency": currency,
             "status": "unpaid",
-            "created_at": datetime.now().isoformat(),
-            "expires_at": (datetime.now() + timedelta(hours=1)).isoformat(),
+            "created_at": now.isoformat(),
+            "expires_at": expires_at,
             "telegram_user_id": telegram_user_id
         }
         data["orders"].append(order)
+        index_appended(data, "orders", order)
         logger.info(f"💰 New payment order created #{order['order_number']}: ${amount} + {bonus_percentage}% bonus = ${total_amount}")
 
-    save_data(data)
+    await save_data_async(data)
 
     return {
         "status": "success",
@@ -1527,25 +1943,25 @@ async def get_user_orders(status: str = "all", user: dict = Depends(get_telegram
 
     USER ISOLATION: Требуется авторизация. Возвращает только заказы этого пользователя.
     """
-    data = load_data()
+    data = await load_data_async()
 
     telegram_user_id = user.get("telegram_id")
 
-    # USER ISOLATION: Фильтруем заказы по telegram_user_id
-    all_orders = [o for o in data.get("orders", []) if o.get("telegram_user_id") == telegram_user_id]
+    idx = get_data_indexes(data)
 
-    # Фильтруем ордера по статусу
-    if status == "booked":
-        filtered_orders = [o for o in all_orders if o.get("status") == "booked"]
-    elif status == "unpaid":
-        filtered_orders = [o for o in all_orders if o.get("status") == "unpaid"]
-    else:
-        filtered_orders = all_orders
+    # USER ISOLATION: Берём только заказы этого telegram_user_id
+    all_orders = idx["orders_by_user"].get(telegram_user_id, [])
+
+    # Фильтруем ордера по статусу прямо в цикле, без промежуточного списка
+    status_filter = status if status in ("booked", "unpaid") else None
 
     orders = []
-    for order in filtered_orders:
+    for order in all_orders:
+        if status_filter and order.get("status") != status_filter:
+            continue
+
         # Получаем профиль
-        profile = next((p for p in data["profiles"] if p["id"] == order["profile_id"]), None)
+        profile = idx["profiles_by_id"].get(order["profile_id"])
         if not profile:
             continue
 
@@ -1567,9 +1983,9 @@ async def get_user_orders(status: str = "all", user: dict = Depends(get_telegram
         orders.append(order_item)
 
     # Сортируем по времени создания (новые первыми)
-    orders.sort(key=lambda x: x.get("created_at", ""), reverse=True)
+    orders.sort(key=operator.itemgetter("created_at"), reverse=True)
 
-    return {"orders": orders}
+    return ORJSONResponse({"orders": orders})
 
 @app.delete("/api/orders/{order_id}")
 async def delete_order(order_id: int, user: dict = Depends(get_telegram_user)):
@@ -1578,14 +1994,13 @@ async def delete_order(order_id: int, user: dict = Depends(get_telegram_user)):
 
     USER ISOLATION: Пользователь может удалить только свой заказ
     """
-    data = load_data()
+    data = await load_data_async()
 
     telegram_user_id = user.get("telegram_id")
 
     # Находим ордер и проверяем владельца
-    order = next((o for o in data.get("orders", [])
-                  if o.get("id") == order_id
-                  and o.get("telegram_user_id") == telegram_user_id), None)
+    order = next((o for o in get_data_indexes(data)["orders_by_user"].get(telegram_user_id, ())
+                  if o.get("id") == order_id), None)
 
     if not order:
         raise HTTPException(status_code=404, detail="Order not found or unauthorized")
@@ -1593,756 +2008,68 @@ async def delete_order(order_id: int, user: dict = Depends(get_telegram_user)):
     # Удаляем ордер
     initial_count = len(data.get("orders", []))
     data["orders"] = [o for o in data.get("orders", []) if o.get("id") != order_id]
+    mark_data_changed()
 
     if len(data["orders"]) < initial_count:
-        save_data(data)
+        await save_data_async(data)
         logger.info(f"✅ Order {order_id} deleted by user {telegram_user_id}")
         return {"status": "deleted", "order_id": order_id}
     else:
         raise HTTPException(status_code=404, detail="Order not found")
 
+# Переводы интерфейса лежат рядом в translations.json. Ответы сериализуются
+# один раз при импорте: эндпоинт только отдаёт готовые байты, без сборки dict
+# и кодирования JSON
+TRANSLATIONS_FILE = os.path.join(current_dir, "translations.json")
+
+
+def _load_translations_bytes() -> dict:
+    """
+    lang -> готовый JSON; разобранное дерево dict-ов после этого не хранится.
+    Значения, одинаковые во всех языках, лежат в секции "_common" и
+    подмешиваются в каждый язык (переводы языка имеют приоритет).
+    """
+    with open(TRANSLATIONS_FILE, "rb") as f:
+        raw = orjson.loads(f.read())
+    common = raw.pop("_common", {})
+    return {lang: orjson.dumps({**common, **payload}) for lang, payload in raw.items()}
+
+
+_TRANSLATIONS_BYTES = _load_translations_bytes()
+# Переводы меняются только с деплоем: час отдаём из кэша клиента/CDN, ещё сутки —
+# устаревшую копию с фоновой перепроверкой по ETag
+TRANSLATIONS_CACHE_CONTROL = "public, max-age=3600, stale-while-revalidate=86400"
+# Сильный ETag по содержимому — тоже один раз при импорте
+_TRANSLATIONS_ETAGS = {
+    lang: f'"{hashlib.blake2b(body, digest_size=8).hexdigest()}"'
+    for lang, body in _TRANSLATIONS_BYTES.items()
+}
+# Сжатые копии: GZipMiddleware пропускает ответы с Content-Encoding,
+# поэтому переводы не пережимаются на каждый запрос. У сжатого
+# представления свой ETag (другие байты — другой валидатор)
+_TRANSLATIONS_GZIP = {
+    lang: gzip.compress(body, compresslevel=9, mtime=0)
+    for lang, body in _TRANSLATIONS_BYTES.items()
+}
+_TRANSLATIONS_GZIP_ETAGS = {lang: etag[:-1] + '-gzip"' for lang, etag in _TRANSLATIONS_ETAGS.items()}
+
+
 @app.get("/api/translations/{lang}")
-async def get_translations(lang: str):
+async def get_translations(lang: str, request: Request):
     """Получить переводы для указанного языка"""
-    translations = {
-        "en": {
-            "app_name": "Muji",
-            "subtitle": "100% Anonymous Dating",
-            "premium_profiles": "Premium Profiles",
-            "online_now": "Online Now",
-            "anonymous_dating": "Anonymous Dating",
-            "filters": "Filters",
-            "city": "City",
-            "nationality": "Nationality",
-            "travel_city": "Travel City",
-            "all_cities": "All cities",
-            "all_nationalities": "All nationalities",
-            "age": "Age",
-            "height": "Height (cm)",
-            "weight": "Weight (kg)",
-            "chest": "Chest",
-            "gender": "Gender",
-            "all_genders": "All genders",
-            "male": "Male",
-            "female": "Female",
-            "transgender": "Transgender",
-            "chest_sizes": {
-                "1": "1 chest",
-                "2": "2 chest",
-                "3": "3 chest",
-                "4": "4 chest",
-                "5": "5 chest",
-                "6": "6 chest",
-                "7": "7 chest",
-                "8": "8 chest",
-                "9": "9 chest",
-                "10": "10 chest",
-                "11": "11 chest",
-                "12": "12 chest"
-            },
-            "reset": "Reset",
-            "apply": "Apply",
-            "loading": "Loading profiles...",
-            "loading_more": "Loading more profiles...",
-            "view_profile": "View Profile",
-            "write_message": "Write Message",
-            "book_with_crypto": "Book with Crypto",
-            "more": "More",
-            "share": "Share",
-            "chat_with": "Chat with",
-            "type_message": "Type a message...",
-            "send": "➤",
-            "no_chats": "No active chats",
-            "no_profiles": "No profiles found",
-            "new": "NEW",
-            "years": "years",
-            "cm": "cm",
-            "kg": "kg",
-            "download": "Download",
-            "pay_with_crypto": "Pay with Crypto",
-            "crypto_payment": "Crypto Payment",
-            "select_network": "Select Network",
-            "wallet_address": "Wallet Address",
-            "copy": "Copy",
-            "copied": "Copied!",
-            "close": "Close",
-            "payment_awaiting": "Awaiting Confirmation",
-            "payment_processing": "Your reservation will be confirmed in chat, you can close this page.",
-            "timer_label": "Time remaining",
-            "travel_cities": "Travel Cities",
-            "description": "Description",
-            "welcome_message": "Hello! Write me a message",
-            "error_sending": "Error sending message",
-            "promocode": "Promo Code",
-            "enter_promocode": "Enter promo code",
-            "apply_promocode": "Apply",
-            "promocode_applied": "Promo code applied!",
-            "promocode_invalid": "Invalid promo code",
-            "discount": "Discount",
-            "banner_join": "Join Channel",
-            "attach_file": "📎",
-            "file": "File",
-            "photo": "Photo",
-            "video": "Video",
-            "add_comment": "Add Comment",
-            "comments": "Comments",
-            "no_comments": "No comments yet",
-            "your_comment": "Your comment",
-            "post_comment": "Post Comment",
-            "rating": "Rating",
-            "payment_processing": "Processing payment...",
-            "select_crypto": "Select Cryptocurrency",
-            "amount": "Amount",
-            "usd": "USD",
-            "pay_now": "Pay",
-            "booking_profile": "Booking Profile",
-            "vip_catalog": "VIP Catalog",
-            "extra_vip_catalog": "Extra VIP",
-            "secret_catalog": "Secret Catalog",
-            "unlock_access": "Unlock Access",
-            "premium_profiles_count": "premium profiles",
-            "blurred_preview": "Blurred Preview",
-            "access_denied": "Access Denied",
-            "pay_to_unlock": "Pay to unlock full access",
-            "view_all_profiles": "View All Profiles",
-            "from_age": "from",
-            "years_short": "y.o",
-            "comment_permission_required": "To leave comments, you need to use our services first",
-            "complete_transaction_to_comment": "Complete a transaction to unlock comments"
-        },
-        "ja": {
-            "app_name": "Muji",
-            "subtitle": "100% 匿名デート",
-            "premium_profiles": "プレミアムプロフィール",
-            "online_now": "オンライン",
-            "anonymous_dating": "匿名デート",
-            "filters": "フィルター",
-            "city": "都市",
-            "nationality": "国籍",
-            "travel_city": "旅行先都市",
-            "all_cities": "すべての都市",
-            "all_nationalities": "すべての国籍",
-            "age": "年齢",
-            "height": "身長 (cm)",
-            "weight": "体重 (kg)",
-            "chest": "バスト",
-            "gender": "性別",
-            "all_genders": "すべての性別",
-            "male": "男性",
-            "female": "女性",
-            "transgender": "トランスジェンダー",
-            "chest_sizes": {
-                "1": "1 バスト",
-                "2": "2 バスト",
-                "3": "3 バスト",
-                "4": "4 バスト",
-                "5": "5 バスト",
-                "6": "6 バスト",
-                "7": "7 バスト",
-                "8": "8 バスト",
-                "9": "9 バスト",
-                "10": "10 バスト",
-                "11": "11 バスト",
-                "12": "12 バスト"
-            },
-            "reset": "リセット",
-            "apply": "適用",
-            "loading": "プロフィールを読み込み中...",
-            "loading_more": "さらに読み込み中...",
-            "view_profile": "プロフィールを見る",
-            "write_message": "メッセージを送る",
-            "book_with_crypto": "暗号通貨で予約",
-            "more": "もっと見る",
-            "share": "共有",
-            "chat_with": "とのチャット",
-            "type_message": "メッセージを入力...",
-            "send": "➤",
-            "no_chats": "アクティブなチャットはありません",
-            "no_profiles": "プロフィールが見つかりません",
-            "new": "新着",
-            "years": "歳",
-            "cm": "cm",
-            "kg": "kg",
-            "download": "ダウンロード",
-            "pay_with_crypto": "暗号通貨で支払う",
-            "crypto_payment": "暗号通貨決済",
-            "select_network": "ネットワークを選択",
-            "wallet_address": "ウォレットアドレス",
-            "copy": "コピー",
-            "copied": "コピーしました！",
-            "close": "閉じる",
-            "payment_awaiting": "確認待ち",
-            "payment_processing": "予約はチャットで確認されます。このページを閉じてください。",
-            "timer_label": "残り時間",
-            "travel_cities": "旅行先都市",
-            "description": "説明",
-            "welcome_message": "こんにちは！メッセージをお待ちしています",
-            "error_sending": "メッセージ送信エラー",
-            "promocode": "プロモコード",
-            "enter_promocode": "プロモコードを入力",
-            "apply_promocode": "適用",
-            "promocode_applied": "プロモコードが適用されました！",
-            "promocode_invalid": "無効なプロモコード",
-            "discount": "割引",
-            "banner_join": "チャンネルに参加",
-            "attach_file": "📎",
-            "file": "ファイル",
-            "photo": "写真",
-            "video": "ビデオ",
-            "add_comment": "コメントを追加",
-            "comments": "コメント",
-            "no_comments": "まだコメントはありません",
-            "your_comment": "コメントを入力",
-            "post_comment": "コメントを投稿",
-            "rating": "評価",
-            "payment_processing": "支払いを処理中...",
-            "select_crypto": "暗号通貨を選択",
-            "amount": "金額",
-            "usd": "USD",
-            "pay_now": "支払う",
-            "booking_profile": "予約プロフィール",
-            "vip_catalog": "VIPカタログ",
-            "extra_vip_catalog": "エクストラVIP",
-            "secret_catalog": "シークレットカタログ",
-            "unlock_access": "アクセスを解除",
-            "premium_profiles_count": "プレミアムプロフィール",
-            "blurred_preview": "ぼかしプレビュー",
-            "access_denied": "アクセス拒否",
-            "pay_to_unlock": "フルアクセスを解除するには支払いが必要です",
-            "view_all_profiles": "すべてのプロフィールを見る",
-            "from_age": "から",
-            "years_short": "歳",
-            "comment_permission_required": "コメントを投稿するには、まずサービスをご利用ください",
-            "complete_transaction_to_comment": "取引を完了してコメントを解除してください"
-        },
-        "ko": {
-            "app_name": "Muji",
-            "subtitle": "100% 익명 데이트",
-            "premium_profiles": "프리미엄 프로필",
-            "online_now": "온라인",
-            "anonymous_dating": "익명 데이트",
-            "filters": "필터",
-            "city": "도시",
-            "nationality": "국적",
-            "travel_city": "여행 도시",
-            "all_cities": "모든 도시",
-            "all_nationalities": "모든 국적",
-            "age": "나이",
-            "height": "키 (cm)",
-            "weight": "체중 (kg)",
-            "chest": "가슴",
-            "gender": "성별",
-            "all_genders": "모든 성별",
-            "male": "남성",
-            "female": "여성",
-            "transgender": "트랜스젠더",
-            "chest_sizes": {
-                "1": "1 가슴",
-                "2": "2 가슴",
-                "3": "3 가슴",
-                "4": "4 가슴",
-                "5": "5 가슴",
-                "6": "6 가슴",
-                "7": "7 가슴",
-                "8": "8 가슴",
-                "9": "9 가슴",
-                "10": "10 가슴",
-                "11": "11 가슴",
-                "12": "12 가슴"
-            },
-            "reset": "초기화",
-            "apply": "적용",
-            "loading": "프로필 로딩 중...",
-            "loading_more": "더 불러오는 중...",
-            "view_profile": "프로필 보기",
-            "write_message": "메시지 보내기",
-            "book_with_crypto": "암호화폐로 예약",
-            "more": "더보기",
-            "share": "공유",
-            "chat_with": "와의 채팅",
-            "type_message": "메시지를 입력하세요...",
-            "send": "➤",
-            "no_chats": "활성화된 채팅이 없습니다",
-            "no_profiles": "프로필을 찾을 수 없습니다",
-            "new": "새로운",
-            "years": "세",
-            "cm": "cm",
-            "kg": "kg",
-            "download": "다운로드",
-            "pay_with_crypto": "암호화폐로 결제",
-            "crypto_payment": "암호화폐 결제",
-            "select_network": "네트워크 선택",
-            "wallet_address": "지갑 주소",
-            "copy": "복사",
-            "copied": "복사되었습니다!",
-            "close": "닫기",
-            "payment_awaiting": "확인 대기 중",
-            "payment_processing": "예약은 채팅에서 확인됩니다. 이 페이지를 닫으셔도 됩니다.",
-            "timer_label": "남은 시간",
-            "travel_cities": "여행 도시",
-            "description": "설명",
-            "welcome_message": "안녕하세요! 메시지를 보내주세요",
-            "error_sending": "메시지 전송 오류",
-            "promocode": "프로모 코드",
-            "enter_promocode": "프로모 코드 입력",
-            "apply_promocode": "적용",
-            "promocode_applied": "프로모 코드가 적용되었습니다!",
-            "promocode_invalid": "유효하지 않은 프로모 코드",
-            "discount": "할인",
-            "banner_join": "채널 참여",
-            "attach_file": "📎",
-            "file": "파일",
-            "photo": "사진",
-            "video": "동영상",
-            "add_comment": "댓글 추가",
-            "comments": "댓글",
-            "no_comments": "아직 댓글이 없습니다",
-            "your_comment": "댓글 입력",
-            "post_comment": "댓글 작성",
-            "rating": "평점",
-            "payment_processing": "결제 처리 중...",
-            "select_crypto": "암호화폐 선택",
-            "amount": "금액",
-            "usd": "USD",
-            "pay_now": "결제",
-            "booking_profile": "예약 프로필",
-            "vip_catalog": "VIP 카탈로그",
-            "extra_vip_catalog": "익스트라 VIP",
-            "secret_catalog": "시크릿 카탈로그",
-            "unlock_access": "액세스 잠금 해제",
-            "premium_profiles_count": "프리미엄 프로필",
-            "blurred_preview": "흐릿한 미리보기",
-            "access_denied": "액세스 거부",
-            "pay_to_unlock": "전체 액세스를 해제하려면 결제가 필요합니다",
-            "view_all_profiles": "모든 프로필 보기",
-            "from_age": "부터",
-            "years_short": "세",
-            "comment_permission_required": "댓글을 남기려면 먼저 서비스를 이용해야 합니다",
-            "complete_transaction_to_comment": "거래를 완료하여 댓글을 잠금 해제하세요"
-        },
-        "zh": {
-            "app_name": "Muji",
-            "subtitle": "100% 匿名约会",
-            "premium_profiles": "高级资料",
-            "online_now": "在线",
-            "anonymous_dating": "匿名约会",
-            "filters": "筛选",
-            "city": "城市",
-            "nationality": "国籍",
-            "travel_city": "旅行城市",
-            "all_cities": "所有城市",
-            "all_nationalities": "所有国籍",
-            "age": "年龄",
-            "height": "身高 (厘米)",
-            "weight": "体重 (公斤)",
-            "chest": "胸围",
-            "gender": "性别",
-            "all_genders": "所有性别",
-            "male": "男性",
-            "female": "女性",
-            "transgender": "跨性别",
-            "chest_sizes": {
-                "1": "1 胸围",
-                "2": "2 胸围",
-                "3": "3 胸围",
-                "4": "4 胸围",
-                "5": "5 胸围",
-                "6": "6 胸围",
-                "7": "7 胸围",
-                "8": "8 胸围",
-                "9": "9 胸围",
-                "10": "10 胸围",
-                "11": "11 胸围",
-                "12": "12 胸围"
-            },
-            "reset": "重置",
-            "apply": "应用",
-            "loading": "正在加载资料...",
-            "loading_more": "正在加载更多资料...",
-            "view_profile": "查看资料",
-            "write_message": "发送消息",
-            "book_with_crypto": "用加密货币预订",
-            "more": "更多",
-            "share": "分享",
-            "chat_with": "与聊天",
-            "type_message": "输入消息...",
-            "send": "➤",
-            "no_chats": "没有活跃聊天",
-            "no_profiles": "未找到资料",
-            "new": "新",
-            "years": "岁",
-            "cm": "厘米",
-            "kg": "公斤",
-            "download": "下载",
-            "pay_with_crypto": "用加密货币支付",
-            "crypto_payment": "加密货币支付",
-            "select_network": "选择网络",
-            "wallet_address": "钱包地址",
-            "copy": "复制",
-            "copied": "已复制！",
-            "close": "关闭",
-            "payment_awaiting": "等待确认",
-            "payment_processing": "您的预订将在聊天中确认，您可以关闭此页面。",
-            "timer_label": "剩余时间",
-            "travel_cities": "旅行城市",
-            "description": "描述",
-            "welcome_message": "你好！给我发消息",
-            "error_sending": "发送消息错误",
-            "promocode": "优惠码",
-            "enter_promocode": "输入优惠码",
-            "apply_promocode": "应用",
-            "promocode_applied": "优惠码已应用！",
-            "promocode_invalid": "无效的优惠码",
-            "discount": "折扣",
-            "banner_join": "加入频道",
-            "attach_file": "📎",
-            "file": "文件",
-            "photo": "照片",
-            "video": "视频",
-            "add_comment": "添加评论",
-            "comments": "评论",
-            "no_comments": "暂无评论",
-            "your_comment": "您的评论",
-            "post_comment": "发表评论",
-            "rating": "评分",
-            "payment_processing": "处理付款中...",
-            "select_crypto": "选择加密货币",
-            "amount": "金额",
-            "usd": "美元",
-            "pay_now": "支付",
-            "booking_profile": "预订资料",
-            "vip_catalog": "VIP目录",
-            "extra_vip_catalog": "额外VIP",
-            "secret_catalog": "秘密目录",
-            "unlock_access": "解锁访问",
-            "premium_profiles_count": "高级资料",
-            "blurred_preview": "模糊预览",
-            "access_denied": "访问被拒绝",
-            "pay_to_unlock": "支付以解锁完整访问",
-            "view_all_profiles": "查看所有资料",
-            "from_age": "从",
-            "years_short": "岁",
-            "comment_permission_required": "要发表评论，您需要先使用我们的服务",
-            "complete_transaction_to_comment": "完成交易以解锁评论"
-        },
-        "ar": {
-            "app_name": "Muji",
-            "subtitle": "مواعدة مجهولة 100%",
-            "premium_profiles": "الملفات المميزة",
-            "online_now": "متصل الآن",
-            "anonymous_dating": "مواعدة مجهولة",
-            "filters": "الفلاتر",
-            "city": "المدينة",
-            "nationality": "الجنسية",
-            "travel_city": "مدينة السفر",
-            "all_cities": "جميع المدن",
-            "all_nationalities": "جميع الجنسيات",
-            "age": "العمر",
-            "height": "الطول (سم)",
-            "weight": "الوزن (كجم)",
-            "chest": "الصدر",
-            "gender": "الجنس",
-            "all_genders": "جميع الأجناس",
-            "male": "ذكر",
-            "female": "أنثى",
-            "transgender": "متحول جنسي",
-            "chest_sizes": {
-                "1": "1 صدر",
-                "2": "2 صدر",
-                "3": "3 صدر",
-                "4": "4 صدر",
-                "5": "5 صدر",
-                "6": "6 صدر",
-                "7": "7 صدر",
-                "8": "8 صدر",
-                "9": "9 صدر",
-                "10": "10 صدر",
-                "11": "11 صدر",
-                "12": "12 صدر"
-            },
-            "reset": "إعادة تعيين",
-            "apply": "تطبيق",
-            "loading": "جاري تحميل الملفات...",
-            "loading_more": "جاري تحميل المزيد...",
-            "view_profile": "عرض الملف",
-            "write_message": "كتابة رسالة",
-            "book_with_crypto": "حجز بالعملة المشفرة",
-            "more": "المزيد",
-            "share": "مشاركة",
-            "chat_with": "الدردشة مع",
-            "type_message": "اكتب رسالة...",
-            "send": "➤",
-            "no_chats": "لا توجد دردشات نشطة",
-            "no_profiles": "لم يتم العثور على ملفات",
-            "new": "جديد",
-            "years": "سنة",
-            "cm": "سم",
-            "kg": "كجم",
-            "download": "تحميل",
-            "pay_with_crypto": "الدفع بالعملة المشفرة",
-            "crypto_payment": "دفع بالعملة المشفرة",
-            "select_network": "اختر الشبكة",
-            "wallet_address": "عنوان المحفظة",
-            "copy": "نسخ",
-            "copied": "تم النسخ!",
-            "close": "إغلاق",
-            "payment_awaiting": "بانتظار التأكيد",
-            "payment_processing": "سيتم تأكيد حجزك في الدردشة، يمكنك إغلاق هذه الصفحة.",
-            "timer_label": "الوقت المتبقي",
-            "travel_cities": "مدن السفر",
-            "description": "الوصف",
-            "welcome_message": "مرحباً! اكتب لي رسالة",
-            "error_sending": "خطأ في إرسال الرسالة",
-            "promocode": "كود الخصم",
-            "enter_promocode": "أدخل كود الخصم",
-            "apply_promocode": "تطبيق",
-            "promocode_applied": "تم تطبيق كود الخصم!",
-            "promocode_invalid": "كود خصم غير صالح",
-            "discount": "خصم",
-            "banner_join": "انضم إلى القناة",
-            "attach_file": "📎",
-            "file": "ملف",
-            "photo": "صورة",
-            "video": "فيديو",
-            "add_comment": "إضافة تعليق",
-            "comments": "التعليقات",
-            "no_comments": "لا توجد تعليقات بعد",
-            "your_comment": "تعليقك",
-            "post_comment": "نشر التعليق",
-            "rating": "التقييم",
-            "payment_processing": "جاري معالجة الدفع...",
-            "select_crypto": "اختر العملة المشفرة",
-            "amount": "المبلغ",
-            "usd": "دولار",
-            "pay_now": "ادفع",
-            "booking_profile": "حجز الملف",
-            "vip_catalog": "كتالوج VIP",
-            "extra_vip_catalog": "VIP الإضافي",
-            "secret_catalog": "الكتالوج السري",
-            "unlock_access": "فتح الوصول",
-            "premium_profiles_count": "الملفات المميزة",
-            "blurred_preview": "معاينة ضبابية",
-            "access_denied": "تم رفض الوصول",
-            "pay_to_unlock": "ادفع لفتح الوصول الكامل",
-            "view_all_profiles": "عرض جميع الملفات",
-            "from_age": "من",
-            "years_short": "سنة",
-            "comment_permission_required": "لترك تعليقات، تحتاج إلى استخدام خدماتنا أولاً",
-                       "complete_transaction_to_comment": "أكمل معاملة لفتح التعليقات"
-        },
-        "de": {
-            "app_name": "Muji",
-            "subtitle": "100% Anonymes Dating",
-            "premium_profiles": "Premium Profile",
-            "online_now": "Jetzt online",
-            "anonymous_dating": "Anonymes Dating",
-            "filters": "Filter",
-            "city": "Stadt",
-            "nationality": "Nationalität",
-            "travel_city": "Reisestadt",
-            "all_cities": "Alle Städte",
-            "all_nationalities": "Alle Nationalitäten",
-            "age": "Alter",
-            "height": "Größe (cm)",
-            "weight": "Gewicht (kg)",
-            "chest": "Brust",
-            "gender": "Geschlecht",
-            "all_genders": "Alle Geschlechter",
-            "male": "Männlich",
-            "female": "Weiblich",
-            "transgender": "Transgender",
-            "chest_sizes": {
-                "1": "1 Brust",
-                "2": "2 Brust",
-                "3": "3 Brust",
-                "4": "4 Brust",
-                "5": "5 Brust",
-                "6": "6 Brust",
-                "7": "7 Brust",
-                "8": "8 Brust",
-                "9": "9 Brust",
-                "10": "10 Brust",
-                "11": "11 Brust",
-                "12": "12 Brust"
-            },
-            "reset": "Zurücksetzen",
-            "apply": "Anwenden",
-            "loading": "Profile werden geladen...",
-            "loading_more": "Weitere Profile werden geladen...",
-            "view_profile": "Profil anzeigen",
-            "write_message": "Nachricht schreiben",
-            "book_with_crypto": "Mit Krypto buchen",
-            "more": "Mehr",
-            "share": "Teilen",
-            "chat_with": "Chat mit",
-            "type_message": "Nachricht eingeben...",
-            "send": "➤",
-            "no_chats": "Keine aktiven Chats",
-            "no_profiles": "Keine Profile gefunden",
-            "new": "NEU",
-            "years": "Jahre",
-            "cm": "cm",
-            "kg": "kg",
-            "download": "Herunterladen",
-            "pay_with_crypto": "Mit Krypto bezahlen",
-            "crypto_payment": "Krypto-Zahlung",
-            "select_network": "Netzwerk auswählen",
-            "wallet_address": "Wallet-Adresse",
-            "copy": "Kopieren",
-            "copied": "Kopiert!",
-            "close": "Schließen",
-            "payment_awaiting": "Warte auf Bestätigung",
-            "payment_processing": "Ihre Buchung wird im Chat bestätigt, Sie können diese Seite schließen.",
-            "timer_label": "Verbleibende Zeit",
-            "travel_cities": "Reisestädte",
-            "description": "Beschreibung",
-            "welcome_message": "Hallo! Schreiben Sie mir eine Nachricht",
-            "error_sending": "Fehler beim Senden der Nachricht",
-            "promocode": "Promo-Code",
-            "enter_promocode": "Promo-Code eingeben",
-            "apply_promocode": "Anwenden",
-            "promocode_applied": "Promo-Code angewendet!",
-            "promocode_invalid": "Ungültiger Promo-Code",
-            "discount": "Rabatt",
-            "banner_join": "Kanal beitreten",
-            "attach_file": "📎",
-            "file": "Datei",
-            "photo": "Foto",
-            "video": "Video",
-            "add_comment": "Kommentar hinzufügen",
-            "comments": "Kommentare",
-            "no_comments": "Noch keine Kommentare",
-            "your_comment": "Ihr Kommentar",
-            "post_comment": "Kommentar posten",
-            "rating": "Bewertung",
-            "payment_processing": "Zahlung wird verarbeitet...",
-            "select_crypto": "Kryptowährung auswählen",
-            "amount": "Betrag",
-            "usd": "USD",
-            "pay_now": "Bezahlen",
-            "booking_profile": "Profil buchen",
-            "vip_catalog": "VIP-Katalog",
-            "extra_vip_catalog": "Extra VIP",
-            "secret_catalog": "Geheimer Katalog",
-            "unlock_access": "Zugang freischalten",
-            "premium_profiles_count": "Premium-Profile",
-            "blurred_preview": "Verschwommene Vorschau",
-            "access_denied": "Zugriff verweigert",
-            "pay_to_unlock": "Bezahlen Sie, um vollen Zugriff zu erhalten",
-            "view_all_profiles": "Alle Profile anzeigen",
-            "from_age": "von",
-            "years_short": "Jahre",
-            "comment_permission_required": "Um Kommentare zu hinterlassen, müssen Sie zuerst unsere Dienste nutzen",
-            "complete_transaction_to_comment": "Schließen Sie eine Transaktion ab, um Kommentare freizuschalten"
-        },
-        "es": {
-            "app_name": "Muji",
-            "subtitle": "Citas 100% Anónimas",
-            "premium_profiles": "Perfiles Premium",
-            "online_now": "En Línea",
-            "anonymous_dating": "Citas Anónimas",
-            "filters": "Filtros",
-            "city": "Ciudad",
-            "nationality": "Nacionalidad",
-            "travel_city": "Ciudad de Viaje",
-            "all_cities": "Todas las ciudades",
-            "all_nationalities": "Todas las nacionalidades",
-            "age": "Edad",
-            "height": "Altura (cm)",
-            "weight": "Peso (kg)",
-            "chest": "Pecho",
-            "gender": "Género",
-            "all_genders": "Todos los géneros",
-            "male": "Masculino",
-            "female": "Femenino",
-            "transgender": "Transgénero",
-            "chest_sizes": {
-                "1": "1 pecho",
-                "2": "2 pecho",
-                "3": "3 pecho",
-                "4": "4 pecho",
-                "5": "5 pecho",
-                "6": "6 pecho",
-                "7": "7 pecho",
-                "8": "8 pecho",
-                "9": "9 pecho",
-                "10": "10 pecho",
-                "11": "11 pecho",
-                "12": "12 pecho"
-            },
-            "reset": "Restablecer",
-            "apply": "Aplicar",
-            "loading": "Cargando perfiles...",
-            "loading_more": "Cargando más perfiles...",
-            "view_profile": "Ver Perfil",
-            "write_message": "Escribir Mensaje",
-            "book_with_crypto": "Reservar con Cripto",
-            "more": "Más",
-            "share": "Compartir",
-            "chat_with": "Chat con",
-            "type_message": "Escribe un mensaje...",
-            "send": "➤",
-            "no_chats": "No hay chats activos",
-            "no_profiles": "No se encontraron perfiles",
-            "new": "NUEVO",
-            "years": "años",
-            "cm": "cm",
-            "kg": "kg",
-            "download": "Descargar",
-            "pay_with_crypto": "Pagar con Cripto",
-            "crypto_payment": "Pago con Cripto",
-            "select_network": "Seleccionar Red",
-            "wallet_address": "Dirección de Wallet",
-            "copy": "Copiar",
-            "copied": "¡Copiado!",
-            "close": "Cerrar",
-            "payment_awaiting": "Esperando Confirmación",
-            "payment_processing": "Su reserva será confirmada en el chat, puede cerrar esta página.",
-            "timer_label": "Tiempo restante",
-            "travel_cities": "Ciudades de Viaje",
-            "description": "Descripción",
-            "welcome_message": "¡Hola! Escríbeme un mensaje",
-            "error_sending": "Error al enviar mensaje",
-            "promocode": "Código Promocional",
-            "enter_promocode": "Ingresar código promocional",
-            "apply_promocode": "Aplicar",
-            "promocode_applied": "¡Código promocional aplicado!",
-            "promocode_invalid": "Código promocional inválido",
-            "discount": "Descuento",
-            "banner_join": "Unirse al Canal",
-            "attach_file": "📎",
-            "file": "Archivo",
-            "photo": "Foto",
-            "video": "Video",
-            "add_comment": "Agregar Comentario",
-            "comments": "Comentarios",
-            "no_comments": "Aún no hay comentarios",
-            "your_comment": "Tu comentario",
-            "post_comment": "Publicar Comentario",
-            "rating": "Calificación",
-            "payment_processing": "Procesando pago...",
-            "select_crypto": "Seleccionar Criptomoneda",
-            "amount": "Cantidad",
-            "usd": "USD",
-            "pay_now": "Pagar",
-            "booking_profile": "Reservar Perfil",
-            "vip_catalog": "Catálogo VIP",
-            "extra_vip_catalog": "Extra VIP",
-            "secret_catalog": "Catálogo Secreto",
-            "unlock_access": "Desbloquear Acceso",
-            "premium_profiles_count": "perfiles premium",
-            "blurred_preview": "Vista Previa Difuminada",
-            "access_denied": "Acceso Denegado",
-            "pay_to_unlock": "Pague para desbloquear el acceso completo",
-            "view_all_profiles": "Ver Todos los Perfiles",
-            "from_age": "de",
-            "years_short": "años",
-            "comment_permission_required": "Para dejar comentarios, primero debe usar nuestros servicios",
-            "complete_transaction_to_comment": "Complete una transacción para desbloquear comentarios"
-        }
-    }
-
-    return translations.get(lang, translations["en"])
+    if lang not in _TRANSLATIONS_BYTES:
+        lang = "en"
+    headers = {"Cache-Control": TRANSLATIONS_CACHE_CONTROL, "Vary": "Accept-Encoding"}
+    if "gzip" in request.headers.get("accept-encoding", ""):
+        body, etag = _TRANSLATIONS_GZIP[lang], _TRANSLATIONS_GZIP_ETAGS[lang]
+        headers["Content-Encoding"] = "gzip"
+    else:
+        body, etag = _TRANSLATIONS_BYTES[lang], _TRANSLATIONS_ETAGS[lang]
+    headers["ETag"] = etag
+    if request.headers.get("if-none-match") == etag:
+        headers.pop("Content-Encoding", None)
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
 
 @app.get("/api/test")
 async def test():
@@ -2352,4 +2079,8 @@ if __name__ == "__main__":
     print("🚀 Сервер Muji запущен на http://localhost:8001")
     print("📱 Основной сайт: http://localhost:8001")
     print("⚠️  Внимание: Для админ панели запустите admin.py на порту 8002!")
-    uvicorn.run(app, host="0.0.0.0", port=8001, access_log=False)
+    # Один процесс намеренно: кэш данных, групповая запись data.json, счётчики id
+    # и кэш сессий живут в памяти процесса — несколько воркеров теряли бы записи
+    # друг друга. Скорость даёт uvicorn[standard]: uvloop и httptools вместо
+    # asyncio и h11 (loop/http="auto" выбирают их, если они установлены)
+    uvicorn.run(app, host="0.0.0.0", port=8001, access_log=False, loop="auto", http="auto")
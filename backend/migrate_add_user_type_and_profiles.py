@@ -24,8 +24,19 @@ def run_migration():
 
     conn = sqlite3.connect(DATABASE_PATH)
     cursor = conn.cursor()
+    # Connection-local tuning for the bulk steps; journal_mode is left as is
+    # because it is a persistent property of the database file
+    cursor.executescript("""
+        PRAGMA synchronous = NORMAL;
+        PRAGMA temp_store = MEMORY;
+        PRAGMA cache_size = -65536;
+    """)
 
     try:
+        # All steps (DDL included) run in one transaction: a single commit
+        # instead of one per statement, and a failed step leaves nothing behind
+        cursor.execute("BEGIN IMMEDIATE")
+
         # Step 1: Check if user_type column already exists
         cursor.execute("PRAGMA table_info(users)")
         columns = [row[1] for row in cursor.fetchall()]
@@ -87,16 +98,15 @@ def run_migration():
         conn.commit()
         logger.info("✅ Migration completed successfully!")
 
-        # Show statistics
-        cursor.execute("SELECT COUNT(*) FROM users")
-        user_count = cursor.fetchone()[0]
+        # Show statistics (the per-type counts already add up to the user total,
+        # so users is scanned once)
+        cursor.execute("SELECT user_type, COUNT(*) FROM users GROUP BY user_type")
+        user_types = cursor.fetchall()
+        user_count = sum(count for _, count in user_types)
 
         cursor.execute("SELECT COUNT(*) FROM profiles")
         profile_count = cursor.fetchone()[0]
 
-        cursor.execute("SELECT user_type, COUNT(*) FROM users GROUP BY user_type")
-        user_types = cursor.fetchall()
-
         logger.info("\n📊 Database Statistics:")
         logger.info(f"   Total users: {user_count}")
         logger.info(f"   Total profiles: {profile_count}")
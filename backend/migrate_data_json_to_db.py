@@ -4,9 +4,12 @@ Migrate data from data.json to SQLite database
 This script migrates all data from JSON file to the unified database
 """
 
-import json
+import orjson
 import os
 import logging
+import sqlite3
+from datetime import datetime
+from contextlib import contextmanager
 import database as db
 
 logging.basicConfig(level=logging.INFO)
@@ -15,169 +18,321 @@ logger = logging.getLogger(__name__)
 current_dir = os.path.dirname(os.path.abspath(__file__))
 DATA_FILE = os.path.join(current_dir, "data.json")
 
+# Statements are module constants: executemany prepares each one once per
+# table, and the row-by-row retry reuses the same text from sqlite3's
+# statement cache
+SQL_INSERT_PROFILE = """
+    INSERT INTO dating_profiles (name, age, gender, nationality, city,
+                                 travel_cities, description, photos, visible,
+                                 created_at, height, weight, chest)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+SQL_INSERT_VIP_PROFILE = """
+    INSERT INTO vip_profiles (name, age, gender, nationality, city,
+                             travel_cities, description, photos, visible,
+                             created_at, height, weight, chest)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+SQL_INSERT_CHAT = """
+    INSERT INTO chats (id, profile_id, telegram_user_id, created_at, last_message_at)
+    VALUES (?, ?, ?, ?, ?)
+"""
+
+SQL_INSERT_MESSAGE = """
+    INSERT INTO messages (id, chat_id, profile_id, telegram_user_id,
+                        sender_type, content, timestamp, is_read)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+# json_type(...) IS NULL means the key is absent: only then is_read
+# defaults to 0, an explicit null stays NULL (like dict.get)
+SQL_INSERT_MESSAGES_JSON = """
+    INSERT INTO messages (id, chat_id, profile_id, telegram_user_id,
+                        sender_type, content, timestamp, is_read)
+    SELECT json_extract(value, '$.id'), json_extract(value, '$.chat_id'),
+           json_extract(value, '$.profile_id'), json_extract(value, '$.telegram_user_id'),
+           json_extract(value, '$.sender_type'), json_extract(value, '$.content'),
+           json_extract(value, '$.timestamp'),
+           CASE WHEN json_type(value, '$.is_read') IS NULL THEN 0
+                ELSE json_extract(value, '$.is_read') END
+    FROM json_each(?)
+"""
+
+SQL_INSERT_ORDER = """
+    INSERT INTO orders (id, telegram_user_id, profile_id, service_type,
+                      amount, currency, payment_method, payment_wallet,
+                      status, created_at, confirmed_at, details)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+SQL_INSERT_PROMOCODE = """
+    INSERT INTO promocodes (code, discount_percent, max_uses,
+                          current_uses, valid_until, active, created_at)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+"""
+
+SQL_INSERT_COMMENT = """
+    INSERT INTO comments (profile_id, telegram_user_id, author_name, rating, comment, created_at, visible)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+"""
+
+SQL_UPSERT_SETTING = """
+    INSERT INTO app_settings (key, value, updated_at)
+    VALUES (?, ?, ?)
+    ON CONFLICT(key) DO UPDATE SET value = excluded.value, updated_at = excluded.updated_at
+"""
+
+
+# Per-table cap on logged row failures; the rest are only counted, so a
+# data.json in an unexpected shape does not turn into one log line per row
+MAX_LOGGED_FAILURES = 10
+
+
+# Tables migrate_data() bulk-inserts into
+MIGRATED_TABLES = ("dating_profiles", "vip_profiles", "chats", "messages",
+                   "orders", "promocodes", "comments")
+
+
+@contextmanager
+def _indexes_dropped(cursor, tables):
+    """
+    Drop the non-unique indexes on tables for the duration of a bulk load
+    and recreate them afterwards from their stored CREATE statements.
+    UNIQUE indexes stay in place so duplicates are still rejected per row;
+    if the process dies in between, init_database() recreates the indexes
+    on the next start (CREATE INDEX IF NOT EXISTS).
+    """
+    placeholders = ", ".join("?" * len(tables))
+    cursor.execute(f"""
+        SELECT name, sql FROM sqlite_master
+        WHERE type = 'index' AND sql IS NOT NULL AND tbl_name IN ({placeholders})
+    """, tables)
+    indexes = [(name, sql) for name, sql in cursor.fetchall()
+               if not sql.lstrip().upper().startswith("CREATE UNIQUE")]
+    for name, _ in indexes:
+        cursor.execute(f'DROP INDEX IF EXISTS "{name}"')
+    try:
+        yield
+    finally:
+        for _, sql in indexes:
+            cursor.execute(sql)
+        logger.info(f"✅ Rebuilt {len(indexes)} indexes")
+
+
+def _to_json_text(value) -> str:
+    """JSON text for TEXT columns (orjson returns bytes)"""
+    return orjson.dumps(value).decode()
+
+
+def _profile_row(profile: dict) -> tuple:
+    """Row for SQL_INSERT_PROFILE / SQL_INSERT_VIP_PROFILE (same column list)"""
+    return (
+        profile['name'], profile['age'], profile['gender'],
+        profile.get('nationality'), profile.get('city'),
+        _to_json_text(profile.get('travel_cities', [])),
+        profile.get('description'),
+        _to_json_text(profile.get('photos', [])),
+        profile.get('visible', True),
+        profile.get('created_at'),
+        profile.get('height'), profile.get('weight'), profile.get('chest')
+    )
+
+
+def _insert_rows(cursor, label, sql, items, to_row, describe):
+    """
+    Insert all items with one executemany and return the number inserted.
+
+    Rows are produced lazily, so a section is never copied into a second
+    list of tuples next to the parsed data. Items that cannot be turned into
+    a row are logged and skipped. If the batch hits a database error, it is
+    rolled back to a savepoint and the rows are retried one by one, so only
+    the offending rows are skipped (the same outcome as per-row inserts).
+    """
+    reported = set()  # items already counted, in case the retry pass meets them again
+    failures = 0
+
+    def fail(name, error):
+        nonlocal failures
+        failures += 1
+        if failures <= MAX_LOGGED_FAILURES:
+            logger.error(f"❌ Failed to migrate {label} {name}: {error}")
+
+    def rows():
+        for item in items:
+            try:
+                row = to_row(item)
+            except Exception as e:
+                if id(item) not in reported:
+                    reported.add(id(item))
+                    fail(describe(item), e)
+                continue
+            yield describe(item), row
+
+    def report_suppressed():
+        if failures > MAX_LOGGED_FAILURES:
+            logger.error(f"❌ ... and {failures - MAX_LOGGED_FAILURES} more {label}s failed to migrate")
+
+    cursor.execute("SAVEPOINT migrate_batch")
+    try:
+        cursor.executemany(sql, (row for _, row in rows()))
+        inserted = cursor.rowcount
+        cursor.execute("RELEASE migrate_batch")
+        report_suppressed()
+        return inserted
+    except sqlite3.Error as e:
+        cursor.execute("ROLLBACK TO migrate_batch")
+        logger.warning(f"⚠️ Batch insert of {label}s failed ({e}), retrying row by row")
+
+    inserted = 0
+    for name, row in rows():
+        try:
+            cursor.execute(sql, row)
+            inserted += 1
+        except sqlite3.Error as e:
+            fail(name, e)
+    cursor.execute("RELEASE migrate_batch")
+    report_suppressed()
+    return inserted
+
+
+# Keys _insert_rows would index directly (a missing one is a per-row error)
+_MESSAGE_REQUIRED_KEYS = ('id', 'chat_id', 'profile_id', 'sender_type', 'content', 'timestamp')
+
+
+def _insert_messages_json(cursor, messages):
+    """
+    Insert all messages with one INSERT ... SELECT over json_each(?).
+
+    The whole list is bound as a single JSON parameter and SQLite fans it
+    out in C, so there is no per-row binding. Returns the number inserted,
+    or None when the caller should fall back to _insert_rows: some message
+    lacks a required key (the fallback logs and skips exactly those), the
+    insert fails, or SQLite was built without JSON1.
+    """
+    if not messages:
+        return 0
+    blob = _to_json_text(messages)
+    missing = " OR ".join(f"json_type(value, '$.{key}') IS NULL" for key in _MESSAGE_REQUIRED_KEYS)
+    try:
+        cursor.execute(f"SELECT 1 FROM json_each(?) WHERE {missing} LIMIT 1", (blob,))
+        if cursor.fetchone():
+            return None
+    except sqlite3.Error:
+        return None
+
+    cursor.execute("SAVEPOINT migrate_json")
+    try:
+        cursor.execute(SQL_INSERT_MESSAGES_JSON, (blob,))
+        inserted = cursor.rowcount
+        cursor.execute("RELEASE migrate_json")
+        return inserted
+    except sqlite3.Error as e:
+        cursor.execute("ROLLBACK TO migrate_json")
+        cursor.execute("RELEASE migrate_json")
+        logger.warning(f"⚠️ json_each insert of messages failed ({e}), falling back to executemany")
+        return None
+
 
 def migrate_data():
     """Migrate data from JSON to database"""
-    if not os.path.exists(DATA_FILE):
+    # Open directly instead of checking os.path.exists first: one syscall
+    # fewer, and no window for the file to vanish between check and open
+    try:
+        f = open(DATA_FILE, 'rb')
+    except FileNotFoundError:
         logger.error(f"❌ {DATA_FILE} not found!")
         return
 
-    logger.info("📦 Loading data from data.json...")
-    with open(DATA_FILE, 'r', encoding='utf-8') as f:
-        data = json.load(f)
+    with f:
+        logger.info(f"📦 Loading data from data.json ({os.fstat(f.fileno()).st_size} bytes)...")
+        data = orjson.loads(f.read())
 
     # Initialize database
     db.init_database()
 
-    # Migrate profiles
-    logger.info("🔄 Migrating dating profiles...")
-    for profile in data.get('profiles', []):
-        try:
-            profile_data = {
-                'name': profile['name'],
-                'age': profile['age'],
-                'gender': profile['gender'],
-                'nationality': profile.get('nationality'),
-                'city': profile.get('city'),
-                'travel_cities': json.dumps(profile.get('travel_cities', [])),
-                'description': profile.get('description'),
-                'photos': json.dumps(profile.get('photos', [])),
-                'visible': profile.get('visible', True),
-                'created_at': profile.get('created_at'),
-                'height': profile.get('height'),
-                'weight': profile.get('weight'),
-                'chest': profile.get('chest')
-            }
-            db.add_dating_profile(profile_data)
-            logger.info(f"✅ Migrated profile: {profile['name']}")
-        except Exception as e:
-            logger.error(f"❌ Failed to migrate profile {profile.get('name')}: {e}")
-
-    # Migrate VIP profiles
-    logger.info("🔄 Migrating VIP profiles...")
+    # Comments and settings get the migration time as created_at/updated_at,
+    # in the same local ISO format as the application's own writes
+    migrated_at = datetime.now().isoformat()
+
+    # Every table goes through this one connection; each table is one
+    # executemany in its own transaction (no connection or commit per row)
     with db.get_db_connection() as conn:
         cursor = conn.cursor()
-        for vip in data.get('vip_profiles', []):
-            try:
-                cursor.execute("""
-                    INSERT INTO vip_profiles (name, age, gender, nationality, city,
-                                             travel_cities, description, photos, visible,
-                                             created_at, height, weight, chest)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                """, (
-                    vip['name'], vip['age'], vip['gender'],
-                    vip.get('nationality'), vip.get('city'),
-                    json.dumps(vip.get('travel_cities', [])),
-                    vip.get('description'),
-                    json.dumps(vip.get('photos', [])),
-                    vip.get('visible', True),
-                    vip.get('created_at'),
-                    vip.get('height'), vip.get('weight'), vip.get('chest')
-                ))
-                logger.info(f"✅ Migrated VIP profile: {vip['name']}")
-            except Exception as e:
-                logger.error(f"❌ Failed to migrate VIP profile {vip.get('name')}: {e}")
+        # One-shot bulk load from a file that is kept: trade crash safety for
+        # speed. These pragmas only affect this connection and end with it,
+        # so the application's connections keep their durable defaults
+        cursor.execute("PRAGMA journal_mode = MEMORY")
+        cursor.execute("PRAGMA synchronous = OFF")
+        cursor.execute("PRAGMA temp_store = MEMORY")
+        cursor.execute("PRAGMA cache_size = -200000")
 
-    # Migrate chats and messages
-    logger.info("🔄 Migrating chats and messages...")
-    for chat in data.get('chats', []):
-        try:
-            with db.get_db_connection() as conn:
-                cursor = conn.cursor()
-                cursor.execute("""
-                    INSERT INTO chats (id, profile_id, telegram_user_id, created_at, last_message_at)
-                    VALUES (?, ?, ?, ?, ?)
-                """, (
-                    chat['id'], chat['profile_id'], chat.get('telegram_user_id'),
-                    chat.get('created_at'), chat.get('last_message_at')
-                ))
-                logger.info(f"✅ Migrated chat: {chat['id']}")
-        except Exception as e:
-            logger.error(f"❌ Failed to migrate chat {chat.get('id')}: {e}")
-
-    for message in data.get('messages', []):
-        try:
-            with db.get_db_connection() as conn:
-                cursor = conn.cursor()
-                cursor.execute("""
-                    INSERT INTO messages (id, chat_id, profile_id, telegram_user_id,
-                                        sender_type, content, timestamp, is_read)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-                """, (
+        # Plain indexes on the target tables are rebuilt once at the end
+        # instead of being updated on every inserted row
+        with _indexes_dropped(cursor, MIGRATED_TABLES):
+            logger.info("🔄 Migrating dating profiles...")
+            count = _insert_rows(cursor, "profile", SQL_INSERT_PROFILE, data.get('profiles', []),
+                                 _profile_row, lambda profile: profile.get('name'))
+            logger.info(f"✅ Migrated {count} profiles")
+
+            logger.info("🔄 Migrating VIP profiles...")
+            count = _insert_rows(cursor, "VIP profile", SQL_INSERT_VIP_PROFILE, data.get('vip_profiles', []),
+                                 _profile_row, lambda vip: vip.get('name'))
+            logger.info(f"✅ Migrated {count} VIP profiles")
+
+            logger.info("🔄 Migrating chats and messages...")
+            count = _insert_rows(cursor, "chat", SQL_INSERT_CHAT, data.get('chats', []), lambda chat: (
+                chat['id'], chat['profile_id'], chat.get('telegram_user_id'),
+                chat.get('created_at'), chat.get('last_message_at')
+            ), lambda chat: chat.get('id'))
+            logger.info(f"✅ Migrated {count} chats")
+
+            count = _insert_messages_json(cursor, data.get('messages', []))
+            if count is None:
+                count = _insert_rows(cursor, "message", SQL_INSERT_MESSAGE, data.get('messages', []), lambda message: (
                     message['id'], message['chat_id'], message['profile_id'],
                     message.get('telegram_user_id'), message['sender_type'],
                     message['content'], message['timestamp'], message.get('is_read', 0)
-                ))
-        except Exception as e:
-            logger.error(f"❌ Failed to migrate message {message.get('id')}: {e}")
+                ), lambda message: message.get('id'))
+            logger.info(f"✅ Migrated {count} messages")
+
+            logger.info("🔄 Migrating orders...")
+            count = _insert_rows(cursor, "order", SQL_INSERT_ORDER, data.get('orders', []), lambda order: (
+                order['id'], order.get('telegram_user_id'), order['profile_id'],
+                order['service_type'], order['amount'], order.get('currency', 'USD'),
+                order.get('payment_method'), order.get('payment_wallet'),
+                order.get('status', 'pending'), order.get('created_at'),
+                order.get('confirmed_at'), _to_json_text(order.get('details', {}))
+            ), lambda order: order.get('id'))
+            logger.info(f"✅ Migrated {count} orders")
+
+            logger.info("🔄 Migrating promocodes...")
+            count = _insert_rows(cursor, "promocode", SQL_INSERT_PROMOCODE, data.get('promocodes', []), lambda promo: (
+                promo['code'], promo['discount_percent'], promo.get('max_uses'),
+                promo.get('current_uses', 0), promo.get('valid_until'),
+                promo.get('active', True), promo.get('created_at')
+            ), lambda promo: promo.get('code'))
+            logger.info(f"✅ Migrated {count} promocodes")
+
+            logger.info("🔄 Migrating comments...")
+            count = _insert_rows(cursor, "comment", SQL_INSERT_COMMENT, data.get('comments', []), lambda comment: (
+                comment['profile_id'], comment.get('telegram_user_id'),
+                comment.get('author_name'), comment['rating'],
+                comment.get('comment'), migrated_at, comment.get('visible', True)
+            ), lambda comment: f"for profile {comment.get('profile_id')}")
+            logger.info(f"✅ Migrated {count} comments")
+
+            logger.info("🔄 Migrating settings...")
+            settings = data.get('settings', {})
+            try:
+                cursor.executemany(SQL_UPSERT_SETTING, [
+                    (category, _to_json_text(values), migrated_at) for category, values in settings.items()
+                ])
+                logger.info(f"✅ Migrated {len(settings)} setting categories")
+            except Exception as e:
+                logger.error(f"❌ Failed to migrate settings: {e}")
 
-    # Migrate orders
-    logger.info("🔄 Migrating orders...")
-    for order in data.get('orders', []):
-        try:
-            with db.get_db_connection() as conn:
-                cursor = conn.cursor()
-                cursor.execute("""
-                    INSERT INTO orders (id, telegram_user_id, profile_id, service_type,
-                                      amount, currency, payment_method, payment_wallet,
-                                      status, created_at, confirmed_at, details)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                """, (
-                    order['id'], order.get('telegram_user_id'), order['profile_id'],
-                    order['service_type'], order['amount'], order.get('currency', 'USD'),
-                    order.get('payment_method'), order.get('payment_wallet'),
-                    order.get('status', 'pending'), order.get('created_at'),
-                    order.get('confirmed_at'), json.dumps(order.get('details', {}))
-                ))
-                logger.info(f"✅ Migrated order: {order['id']}")
-        except Exception as e:
-            logger.error(f"❌ Failed to migrate order {order.get('id')}: {e}")
-
-    # Migrate comments
-    logger.info("🔄 Migrating comments...")
-    for comment in data.get('comments', []):
-        try:
-            comment_data = {
-                'profile_id': comment['profile_id'],
-                'telegram_user_id': comment.get('telegram_user_id'),
-                'author_name': comment.get('author_name'),
-                'rating': comment['rating'],
-                'comment': comment.get('comment'),
-                'visible': comment.get('visible', True)
-            }
-            db.add_comment(comment_data)
-            logger.info(f"✅ Migrated comment for profile: {comment['profile_id']}")
-        except Exception as e:
-            logger.error(f"❌ Failed to migrate comment: {e}")
-
-    # Migrate promocodes
-    logger.info("🔄 Migrating promocodes...")
-    for promo in data.get('promocodes', []):
-        try:
-            with db.get_db_connection() as conn:
-                cursor = conn.cursor()
-                cursor.execute("""
-                    INSERT INTO promocodes (code, discount_percent, max_uses,
-                                          current_uses, valid_until, active, created_at)
-                    VALUES (?, ?, ?, ?, ?, ?, ?)
-                """, (
-                    promo['code'], promo['discount_percent'], promo.get('max_uses'),
-                    promo.get('current_uses', 0), promo.get('valid_until'),
-                    promo.get('active', True), promo.get('created_at')
-                ))
-                logger.info(f"✅ Migrated promocode: {promo['code']}")
-        except Exception as e:
-            logger.error(f"❌ Failed to migrate promocode {promo.get('code')}: {e}")
-
-    # Migrate settings
-    logger.info("🔄 Migrating settings...")
-    settings = data.get('settings', {})
-    try:
-        for category, values in settings.items():
-            db.set_app_setting(category, json.dumps(values))
-            logger.info(f"✅ Migrated setting category: {category}")
-    except Exception as e:
-        logger.error(f"❌ Failed to migrate settings: {e}")
 
     logger.info("✅ Migration completed!")
     logger.info(f"📊 Summary:")
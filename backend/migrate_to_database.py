@@ -3,7 +3,7 @@ Migration script to convert existing JSON data to SQLite database
 This script is provided for reference in case migration from JSON is needed
 """
 
-import json
+import orjson
 import os
 import sys
 import logging
@@ -26,15 +26,17 @@ def migrate_json_to_database():
     This is a helper script for existing deployments
     """
 
-    if not os.path.exists(DATA_FILE):
+    try:
+        f = open(DATA_FILE, 'rb')
+    except FileNotFoundError:
         logger.info("ℹ️ No data.json file found. Nothing to migrate.")
         return
 
     logger.info("📦 Starting migration from JSON to SQLite database...")
 
     try:
-        with open(DATA_FILE, 'r', encoding='utf-8') as f:
-            data = json.load(f)
+        with f:
+            data = orjson.loads(f.read())
 
         # Since the current system doesn't track individual file users in JSON,
         # this is a placeholder for future migration needs
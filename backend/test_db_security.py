@@ -13,6 +13,7 @@ import database as db
 from db_validators import (
     validate_telegram_id,
     verify_user_ownership,
+    verify_file_access,
     check_database_integrity
 )
 
@@ -23,21 +24,17 @@ def test_telegram_id_validation():
     print("TEST 1: Telegram ID Validation")
     print("="*60)
 
-    # Test valid telegram_id
-    assert validate_telegram_id(123456789), "Valid telegram_id should pass"
-    print("✅ Valid telegram_id accepted")
-
-    # Test invalid telegram_id (negative)
-    assert not validate_telegram_id(-123), "Negative telegram_id should fail"
-    print("✅ Negative telegram_id rejected")
-
-    # Test invalid telegram_id (zero)
-    assert not validate_telegram_id(0), "Zero telegram_id should fail"
-    print("✅ Zero telegram_id rejected")
-
-    # Test invalid telegram_id (string)
-    assert not validate_telegram_id("123456"), "String telegram_id should fail"
-    print("✅ String telegram_id rejected")
+    # (label, value, expected result)
+    cases = (
+        ("Valid", 123456789, True),
+        ("Negative", -123, False),
+        ("Zero", 0, False),
+        ("String", "123456", False),
+    )
+    for label, value, expected in cases:
+        assert bool(validate_telegram_id(value)) is expected, \
+            f"{label} telegram_id should {'pass' if expected else 'fail'}"
+        print(f"✅ {label} telegram_id {'accepted' if expected else 'rejected'}")
 
     print("\n✅ All telegram_id validation tests passed!")
 
@@ -79,8 +76,7 @@ def test_user_creation():
             first_name="Invalid",
             last_name="User"
         )
-        print("❌ Should have rejected invalid telegram_id!")
-        sys.exit(1)
+        raise AssertionError("Should have rejected invalid telegram_id")
     except ValueError as e:
         print(f"✅ Invalid telegram_id rejected: {e}")
 
@@ -151,11 +147,13 @@ def test_file_operations():
 
     # Test retrieving file with wrong ownership (should fail)
     wrong_file = db.get_file_by_id(file_id, 777777777)  # Wrong telegram_id
-    if wrong_file is None:
-        print(f"✅ Unauthorized file access blocked")
-    else:
-        print(f"❌ SECURITY ISSUE: Unauthorized file access allowed!")
-        sys.exit(1)
+    assert wrong_file is None, "SECURITY ISSUE: Unauthorized file access allowed"
+    print(f"✅ Unauthorized file access blocked")
+
+    # Test combined file/user ownership check
+    assert verify_file_access(file_id, user['telegram_id']), "Owner should pass file access check"
+    assert not verify_file_access(file_id, 777777777), "Other user should fail file access check"
+    print(f"✅ File access check enforces ownership")
 
     # Test invalid inputs
     try:
@@ -168,8 +166,7 @@ def test_file_operations():
             file_size=1024,
             mime_type="text/plain"
         )
-        print("❌ Should have rejected non-existent user_id")
-        sys.exit(1)
+        raise AssertionError("Should have rejected non-existent user_id")
     except ValueError as e:
         print(f"✅ Invalid user_id rejected: {e}")
 
@@ -185,22 +182,16 @@ def main():
     print("="*60)
     print(f"Database: {db.DATABASE_PATH}")
 
-    try:
-        test_telegram_id_validation()
-        test_user_creation()
-        test_database_integrity()
-        test_file_operations()
-
-        print("\n" + "="*60)
-        print("✅ ALL TESTS PASSED")
-        print("="*60)
-        print("\n🎉 Database security measures are working correctly!\n")
+    # A failing assertion propagates with its traceback and exit status 1
+    test_telegram_id_validation()
+    test_user_creation()
+    test_database_integrity()
+    test_file_operations()
 
-    except Exception as e:
-        print(f"\n❌ TEST FAILED: {e}")
-        import traceback
-        traceback.print_exc()
-        sys.exit(1)
+    print("\n" + "="*60)
+    print("✅ ALL TESTS PASSED")
+    print("="*60)
+    print("\n🎉 Database security measures are working correctly!\n")
 
 
 if __name__ == "__main__":